@@ -9,8 +9,25 @@ to generate course requirements and then list the eligible students for
 a particular course.
 '''
 
+import asyncio
+import json
+import mmap
 import os
 import os.path
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+SNAPSHOT_FOLDER='.snapshot'
+SNAPSHOT_VERSION=2
+SERVER_HOST='127.0.0.1'
+SERVER_PORT=8765
+ANSWER_CACHE_SIZE=1024
+
 def processProgramFile(filepath):
     '''Function used to read information about different programs and store 
         it as an dictionary for retrieval.
@@ -31,6 +48,38 @@ def processProgramFile(filepath):
                 programdict[linelst[0]]=linelst[1].strip()+'.'
         return programName,programdict
 
+def processProgramFiles(folderpath,programfiles):
+    ''' function reads every program file and combines their courses into one dictionary,
+        the first program describing a course wins
+    Parameters: 
+        folderpath - path of the folder with the program files
+        programfiles - names of the program description files
+    Returns:
+           return the combined dictionary of courses in all programs
+    '''
+    programdict={}
+    for programfile in programfiles:
+        programName,programCoursedict =processProgramFile(os.path.join(folderpath,programfile))
+        for key in programCoursedict.keys():
+            if key not in programdict:
+                programdict[key]=programCoursedict[key]
+    return programdict
+
+def programFileNames(folderpath):
+    ''' function finds the program description files program1.txt, program2.txt, ... in a folder,
+        other files starting with program are left out
+    Parameters: 
+        folderpath - path of the folder with the program files
+    Returns:
+           return the list of file names in program number order, program2.txt before program10.txt
+    '''
+    programfiles={}
+    for filename in os.listdir(folderpath):
+        match=re.fullmatch(r'program(\d+)\.txt',filename)
+        if match:
+            programfiles[filename]=int(match.group(1))
+    return sorted(programfiles,key=programfiles.get)
+
 def processPrereqsFile(prereqpath):
     ''' used to read information about the prerequisites structure 
         and store it as dictionary for retrieval
@@ -49,99 +98,753 @@ def processPrereqsFile(prereqpath):
     
     return prereqdict        
 
-def processClassFiles(classfolder):
+def buildPrereqGraph(prereqdict):
+    ''' function builds the prerequisite graph in topological order, checks it for cycles
+        and memoizes the full set of courses required before each course
+    Parameters: 
+        prereqdict - dictionary of prerequisite for course
+    Returns:
+          returns a dictionary with every course as key and the frozenset of its direct
+          and indirect prerequisites as value
+    Raises:
+          ValueError when the prerequisites contain a cycle
+    '''
+    courses=set(prereqdict)
+    for prereqs in prereqdict.values():
+        courses.update(prereqs)
+    
+    #counting the direct prerequisites of each course and the courses unlocked by it
+    waiting={course:len(set(prereqdict.get(course,()))) for course in courses}
+    unlocks={course:[] for course in courses}
+    for course,prereqs in prereqdict.items():
+        for prereq in set(prereqs):
+            unlocks[prereq].append(course)
+    
+    #visiting courses once all their prerequisites are closed
+    closure={}
+    ready=sorted(course for course in courses if waiting[course]==0)
+    while ready:
+        course=ready.pop()
+        required=set()
+        for prereq in prereqdict.get(course,()):
+            required.add(prereq)
+            required.update(closure[prereq])
+        closure[course]=frozenset(required)
+        for nextcourse in unlocks[course]:
+            waiting[nextcourse]-=1
+            if waiting[nextcourse]==0:
+                ready.append(nextcourse)
+    
+    if len(closure)<len(courses):
+        cycle=sorted(course for course in courses if course not in closure)
+        raise ValueError('Prerequisite cycle found, unresolved courses: '+', '.join(cycle))
+    return closure
+
+def processClassFile(filepath):
+    ''' function reads one file in bulk and parses it when it is a class list file
+    Parameters: 
+        filepath - path to a file in the class folder
+    Returns:
+          returns a tuple of the course code and the set of enrolled students,
+          or None when the file is not a class file
+    '''
+    with open(filepath) as currentfile:
+        #checking if class file before reading the rest of it
+        header = currentfile.read(5)
+        if header[:1] !='c' or not header[1:].isdigit():
+            return None
+        
+        lines=currentfile.read().split('\n')
+        
+    #skipping the rest of the header line and any blank lines
+    students={line.split(maxsplit=1)[0] for line in lines[1:] if line and not line.isspace()}
+    return header[1:],students
+
+def processClassFiles(classfolder,basepath=None,workers=None):
     ''' funtion will combine the data about enrollments into courses from multiple files 
-        into a single dictionary organized by course number
+        into a single dictionary organized by course number, reading the files concurrently
     Parameters: 
         classfolder - defining the subfolder with the class list files containing the enrolled student details
+        basepath - folder containing classfolder, the current working directory when omitted
+        workers - number of reader threads, the ThreadPoolExecutor default when omitted
     Returns:
           returns the constructed dictionary of students enrolled in each class
     '''
+    if basepath is None:
+        basepath=os.getcwd()
     
-    Studentsinclass={}
-    folderContentslist=os.listdir(os.path.join(os.getcwd(),classfolder))
+    with os.scandir(os.path.join(basepath,classfolder)) as entries:
+        filepaths=[entry.path for entry in entries if entry.is_file()]
     
-    for filename in folderContentslist:
-        #checking if class file
-        with open(os.path.join(os.getcwd(),classfolder,filename)) as currentfile:
-            
-            checkletter = currentfile.read(1)
-            coursecode = currentfile.read(4)
-            currentfile.readline()
-            #processing the class file
-            if checkletter =='c' and coursecode.isdigit():
-                #creating new key when course not in the dictionary
-                if coursecode not in Studentsinclass: 
-                    Studentsinclass[coursecode]=set()
-                    
-                for line in currentfile:                    
-                    linelst=line.split()
-                    (Studentsinclass.get(coursecode)).add(linelst[0]) 
+    Studentsinclass={}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for classfile in pool.map(processClassFile,filepaths):
+            if classfile is None:
+                continue
+            coursecode,students=classfile
+            #creating new key when course not in the dictionary
+            if coursecode not in Studentsinclass: 
+                Studentsinclass[coursecode]=students
+            else:
+                Studentsinclass[coursecode].update(students)
                     
     return Studentsinclass              
 
-def initFromFiles(folder):
+def rosterBits(roster,position):
+    ''' function converts a roster of student numbers into a bitset of student ids
+    Parameters: 
+        roster - iterable of student numbers
+        position - dictionary mapping every student number to its integer id
+    Returns:
+          returns the bitset as an int
+    '''
+    #setting one bit per enrolled student in a byte buffer before converting it
+    buffer=bytearray((len(position)+7)//8)
+    for student in roster:
+        num=position[student]
+        buffer[num>>3] |= 1<<(num&7)
+    return int.from_bytes(buffer,'little')
+
+def buildRosterIndex(classdict):
+    ''' function maps every student to an integer id once and stores each class
+        roster as a bitset, so eligibility is answered with a few bitwise operations
+    Parameters: 
+        classdict -  dictionary of student enrolled in a class with coursecode as key 
+    Returns:
+          returns a dictionary with the sorted student list, the student to id mapping,
+          the roster bitset of every course and the precomputed bitset of all students
+    '''
+    students=sorted(set().union(*classdict.values()))
+    position={student:num for num,student in enumerate(students)}
+    
+    rosterbits={coursecode:rosterBits(roster,position) for coursecode,roster in classdict.items()}
+        
+    return {'students':students,'position':position,'bits':rosterbits,
+            'all':(1<<len(students))-1}
+
+def buildEligibility(rosterindex,programdict,prereqdict,transitive=False):
+    ''' function precomputes the eligible students of every program course as a bitset
+        and stores them, with the prerequisite closure, in the roster index
+    Parameters: 
+        rosterindex - dictionary returned by buildRosterIndex
+        programdict - dictionary of combined list of classes offered in different programs
+        prereqdict - dictionary of prerequisite for course
+        transitive - if True a course also requires the prerequisites of its prerequisites,
+                     otherwise only the direct prerequisites are required
+    Returns:
+          returns the roster index with the 'closure' and 'eligible' entries added
+    '''
+    closure=buildPrereqGraph(prereqdict)
+    rosterbits=rosterindex['bits']
+    
+    eligible={}
+    for coursecode in programdict:
+        #courses without a roster count as taken by nobody
+        eligiblebits=rosterindex['all'] & ~rosterbits.get(coursecode,0)
+        required=closure.get(coursecode,()) if transitive else prereqdict.get(coursecode,())
+        for prereq in required:
+            eligiblebits &= rosterbits.get(prereq,0)
+        eligible[coursecode]=eligiblebits
+    
+    rosterindex['closure']=closure
+    rosterindex['eligible']=eligible
+    return rosterindex
+
+def decodeRoster(rosterindex,bits):
+    ''' function converts a bitset of student ids back into the student numbers
+    Parameters: 
+        rosterindex - dictionary returned by buildRosterIndex
+        bits - integer bitset of student ids
+    Returns:
+          returns the list of student numbers whose bit is set
+    '''
+    students=rosterindex['students']
+    flags=bin(bits)[:1:-1]
+    eligiblestudents=[]
+    num=flags.find('1')
+    while num>=0:
+        eligiblestudents.append(students[num])
+        num=flags.find('1',num+1)
+    return eligiblestudents
+
+class RosterSets(Mapping):
+    '''Read-only dictionary of the students enrolled in each class, like the one returned by 
+        processClassFiles, backed by the roster bitsets. A roster is decoded into a set of student 
+        numbers only when its course is first looked up. The class lists returned by initFromFiles 
+        are a RosterSets, their rosterindex attribute holds the roster index with the eligibility.
+    '''
+    
+    def __init__(self,rosterindex,rosters=None):
+        '''Creates the dictionary without decoding any roster.
+        Parameters:
+            rosterindex - dictionary with the roster bitsets, like the one returned by buildRosterIndex
+            rosters - optional dictionary of the rosters already known as sets, by course code
+        '''
+        self.rosterindex=rosterindex
+        self.rosters={} if rosters is None else dict(rosters)
+    
+    def __getitem__(self,coursecode):
+        if coursecode not in self.rosters:
+            self.rosters[coursecode]=set(decodeRoster(self.rosterindex,self.rosterindex['bits'][coursecode]))
+        return self.rosters[coursecode]
+    
+    def __iter__(self):
+        return iter(self.rosterindex['bits'])
+    
+    def __len__(self):
+        return len(self.rosterindex['bits'])
+
+def readSnapshot(folderpath):
+    ''' function opens the snapshot written by writeSnapshot, memory-mapping the roster and 
+        eligibility bitsets
+    Parameters: 
+        folderpath - path of the folder with the program, prereq and class files
+    Returns:
+          returns a tuple of the snapshot description and the mapped roster bytes,
+          or None when there is no usable snapshot
+    '''
+    metapath=os.path.join(folderpath,SNAPSHOT_FOLDER,'meta.json')
+    binpath=os.path.join(folderpath,SNAPSHOT_FOLDER,'rosters.bin')
+    if not os.path.exists(metapath) or not os.path.exists(binpath):
+        return None
+    
+    with open(metapath) as metafile:
+        meta=json.load(metafile)
+    if meta.get('version')!=SNAPSHOT_VERSION:
+        return None
+    
+    with open(binpath,'rb') as binfile:
+        size=os.fstat(binfile.fileno()).st_size
+        #checking that the bitsets belong to this description before using them
+        if size!=(len(meta['rosters'])+len(meta['eligible']))*meta['rosterbytes']:
+            return None
+        rosterdata=mmap.mmap(binfile.fileno(),0,access=mmap.ACCESS_READ) if size else b''
+    return meta,rosterdata
+
+def writeSnapshot(folderpath,programfiles,programdict,prereqdict,rosterindex,filebits,sources):
+    ''' function stores the loaded data so the next start only re-parses changed files.
+        The roster bitsets go to a binary file with one fixed size record per class file, 
+        followed by one record per program course with its eligibility bitset, everything 
+        else to a JSON description with the manifest of source file times.
+    Parameters: 
+        folderpath - path of the folder with the program, prereq and class files
+        programfiles - names of the program description files
+        programdict - dictionary of combined list of classes offered in different programs
+        prereqdict - dictionary of prerequisite for course
+        rosterindex - roster index with the student list and the eligibility from buildEligibility
+        filebits - dictionary with the class file name as key and a tuple of the course code 
+                   and the roster bitset as value
+        sources - dictionary with every file name in the folder as key and its modification
+                  time and size as value
+    Returns:
+          The function does not return anything
+    '''
+    snapshotfolder=os.path.join(folderpath,SNAPSHOT_FOLDER)
+    os.makedirs(snapshotfolder,exist_ok=True)
+    students=rosterindex['students']
+    rosterbytes=(len(students)+7)//8
+    
+    #writing to temporary files first so an interrupted run never leaves a broken snapshot
+    rosters={}
+    binpath=os.path.join(snapshotfolder,'rosters.bin')
+    with open(binpath+'.tmp','wb') as binfile:
+        for record,filename in enumerate(sorted(filebits)):
+            coursecode,bits=filebits[filename]
+            binfile.write(bits.to_bytes(rosterbytes,'little'))
+            rosters[filename]=[coursecode,record]
+        eligible={}
+        for record,coursecode in enumerate(rosterindex['eligible'],len(rosters)):
+            binfile.write(rosterindex['eligible'][coursecode].to_bytes(rosterbytes,'little'))
+            eligible[coursecode]=record
+    
+    closure={course:sorted(prereqs) for course,prereqs in rosterindex['closure'].items()}
+    meta={'version':SNAPSHOT_VERSION,'programfiles':programfiles,'programdict':programdict,
+          'prereqdict':prereqdict,'students':students,'rosterbytes':rosterbytes,
+          'rosters':rosters,'eligible':eligible,'closure':closure,'sources':sources}
+    metapath=os.path.join(snapshotfolder,'meta.json')
+    with open(metapath+'.tmp','w') as metafile:
+        json.dump(meta,metafile)
+    
+    os.replace(binpath+'.tmp',binpath)
+    os.replace(metapath+'.tmp',metapath)
+
+def folderManifest(folderpath):
+    ''' function lists the modification time and size of every file in a folder
+    Parameters: 
+        folderpath - path of the folder
+    Returns:
+          returns a dictionary with the file name as key and a list of the modification 
+          time in nanoseconds and the size as value
+    '''
+    sources={}
+    with os.scandir(folderpath) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat=entry.stat()
+                sources[entry.name]=[stat.st_mtime_ns,stat.st_size]
+    return sources
+
+def loadClassFiles(folderpath,snapshotdata=None,workers=None):
+    ''' function loads the roster of every class file as a bitset, taking unchanged files 
+        from the snapshot and parsing only new or changed files
+    Parameters: 
+        folderpath - path of the folder with the class files
+        snapshotdata - tuple returned by readSnapshot, None to parse every file
+        workers - number of threads reading the changed class files
+    Returns:
+          returns a tuple of the student list in integer id order, the dictionary of class
+          file name to course code and roster bitset, the manifest of every file in the 
+          folder and the number of files read
+    '''
+    if snapshotdata is None:
+        meta,rosterdata={'students':[],'rosterbytes':0,'rosters':{},'sources':{}},b''
+    else:
+        meta,rosterdata=snapshotdata
+    students=list(meta['students'])
+    position={student:num for num,student in enumerate(students)}
+    rosterbytes=meta['rosterbytes']
+    
+    filebits={}
+    changed=[]
+    sources=folderManifest(folderpath)
+    for filename,signature in sources.items():
+        if meta['sources'].get(filename)!=signature:
+            changed.append(filename)
+        elif filename in meta['rosters']:
+            #unchanged class file, taking its bitset from the snapshot
+            coursecode,record=meta['rosters'][filename]
+            start=record*rosterbytes
+            filebits[filename]=(coursecode,int.from_bytes(rosterdata[start:start+rosterbytes],'little'))
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        filepaths=[os.path.join(folderpath,filename) for filename in changed]
+        for filename,classfile in zip(changed,pool.map(processClassFile,filepaths)):
+            if classfile is None:
+                continue
+            coursecode,roster=classfile
+            #giving new students the next free ids so snapshot bitsets stay valid
+            for student in roster:
+                if student not in position:
+                    position[student]=len(students)
+                    students.append(student)
+            filebits[filename]=(coursecode,rosterBits(roster,position))
+    
+    return students,filebits,sources,len(changed)
+
+def initFromFiles(folder,basepath=None,programfiles=None,workers=None,timings=None,snapshot=False):
     ''' function will create data structures with the information 
         that is currently available in files by calling the required function
     Parameters: 
-        folder -  a single parameter, defining the subfolder with the files
+        folder -  defining the subfolder with the files
+        basepath - folder containing folder, the current working directory when omitted
+        programfiles - names of the program description files in folder, the files from
+                       programFileNames() when omitted
+        workers - number of threads reading the class files
+        timings - optional dictionary filled with the seconds spent in each loading phase
+        snapshot - if True start from the snapshot in the folder, re-parse only the files
+                   changed since it was written and then update it
     Returns:
            return a tuple with the constructed dictionaries for program courses, 
-           class lists and prerequisites.
+           class lists and prerequisites. The class lists are a RosterSets, read-only like 
+           a dictionary of sets, whose rosterindex attribute holds the roster bitset index
     '''
-    #calling functions to get program details in the file
-    programName1,programCourse1dict =processProgramFile(os.path.join(os.getcwd(),folder,'program1.txt'))
-
-    programName2,programCourse2dict =processProgramFile(os.path.join(os.getcwd(),folder,'program2.txt'))
+    if basepath is None:
+        basepath=os.getcwd()
+    if timings is None:
+        timings={}
+    folderpath=os.path.join(basepath,folder)
+    
+    if programfiles is None:
+        programfiles=programFileNames(folderpath)
     
-    #creating a common dictionary with courses in all programs
-    programdict=programCourse1dict
+    if snapshot:
+        return initFromSnapshot(folderpath,programfiles,workers,timings)
     
-    for key in programCourse2dict.keys():
-        if key not in programdict:
-            programdict[key]=programCourse2dict[key]
+    #calling functions to get program details in the files and creating a common 
+    #dictionary with courses in all programs
+    start=time.perf_counter()
+    programdict=processProgramFiles(folderpath,programfiles)
+    timings['programs']=time.perf_counter()-start
             
     #calling prereq function to get prereq details        
-    prereqdict=processPrereqsFile(os.path.join(os.getcwd(),folder,'prereqs.txt'))
+    start=time.perf_counter()
+    prereqdict=processPrereqsFile(os.path.join(folderpath,'prereqs.txt'))
+    timings['prereqs']=time.perf_counter()-start
     
     #calling function to get student details in different course
-    classdict=processClassFiles(folder)
+    start=time.perf_counter()
+    classdict=processClassFiles(folder,basepath,workers)
+    timings['classes']=time.perf_counter()-start
+    
+    #mapping students to integer ids once and storing the rosters as bitsets
+    start=time.perf_counter()
+    rosterindex=buildRosterIndex(classdict)
+    
+    #checking the prerequisite graph and precomputing eligibility per course
+    buildEligibility(rosterindex,programdict,prereqdict)
+    timings['index']=time.perf_counter()-start
+    
+    return programdict,RosterSets(rosterindex,classdict),prereqdict
+
+def initFromSnapshot(folderpath,programfiles,workers,timings):
+    ''' function creates the data structures of initFromFiles from the folder snapshot,
+        re-parsing only the files changed since the snapshot was written. The class lists 
+        are a RosterSets decoding the rosters on demand, and the eligibility bitsets are taken 
+        from the snapshot when no file changed.
+    Parameters: 
+        folderpath - path of the folder with the files
+        programfiles - names of the program description files
+        workers - number of threads reading the changed class files
+        timings - dictionary filled with the seconds spent in each loading phase
+    Returns:
+           return the same tuple as initFromFiles
+    '''
+    start=time.perf_counter()
+    snapshotdata=readSnapshot(folderpath)
+    timings['snapshot']=time.perf_counter()-start
+    
+    start=time.perf_counter()
+    students,filebits,sources,changed=loadClassFiles(folderpath,snapshotdata,workers)
+    meta=snapshotdata[0] if snapshotdata is not None else None
+    unchanged=(meta is not None and not changed and set(meta['sources'])==set(sources) and 
+               meta['programfiles']==list(programfiles))
+    if unchanged:
+        #nothing changed, taking the eligibility bitsets from the snapshot
+        rosterbytes=meta['rosterbytes']
+        eligible={coursecode:int.from_bytes(snapshotdata[1][record*rosterbytes:(record+1)*rosterbytes],'little') 
+                  for coursecode,record in meta['eligible'].items()}
+    if snapshotdata is not None and isinstance(snapshotdata[1],mmap.mmap):
+        #releasing the mapping so the snapshot file can be replaced
+        snapshotdata[1].close()
+    timings['classes']=time.perf_counter()-start
+    
+    #reusing the program and prereq dictionaries when none of their files changed
+    start=time.perf_counter()
+    inputfiles=list(programfiles)+['prereqs.txt']
+    if (meta is not None and meta['programfiles']==list(programfiles) and 
+            all(meta['sources'].get(filename)==sources.get(filename) for filename in inputfiles)):
+        programdict=meta['programdict']
+        prereqdict={course:tuple(prereqs) for course,prereqs in meta['prereqdict'].items()}
+    else:
+        programdict=processProgramFiles(folderpath,programfiles)
+        prereqdict=processPrereqsFile(os.path.join(folderpath,'prereqs.txt'))
+    timings['programs']=time.perf_counter()-start
+    
+    #combining the file bitsets per course
+    start=time.perf_counter()
+    rosterbits={}
+    for coursecode,bits in filebits.values():
+        rosterbits[coursecode]=rosterbits.get(coursecode,0) | bits
+    allbits=0
+    for bits in rosterbits.values():
+        allbits |= bits
+    rosterindex={'students':students,'position':{student:num for num,student in enumerate(students)},
+                 'bits':rosterbits,'all':allbits}
+    classdict=RosterSets(rosterindex)
+    if unchanged:
+        rosterindex['closure']={course:frozenset(prereqs) for course,prereqs in meta['closure'].items()}
+        rosterindex['eligible']=eligible
+    else:
+        buildEligibility(rosterindex,programdict,prereqdict)
+    timings['index']=time.perf_counter()-start
+    
+    #updating the snapshot when any file was added, changed or removed
+    start=time.perf_counter()
+    if not unchanged:
+        try:
+            writeSnapshot(folderpath,list(programfiles),programdict,prereqdict,rosterindex,filebits,sources)
+        except OSError as error:
+            #a read-only folder still loads, the next start just parses the files again
+            print('Snapshot not written, loading without it:',error)
+    timings['save']=time.perf_counter()-start
     
     return programdict,classdict,prereqdict
 
-def estimateClass(coursecode,programdict,classdict,prereqdict):
+def estimateClass(coursecode,programdict,classdict,prereqdict,rosterindex=None):
     ''' function used to find a list of eligible students for a given class 
     Parameters: 
         coursecode - User inputed coursecode for which eligibile student list to be populated
         programdict - dictionary of combined list of classes offered in different programs
         classdict -  dictionary of student enrolled in a class with coursecode as key 
         prereqdict - dictionary of prerequisite for course
+        rosterindex - optional roster index, taken from the class lists returned by initFromFiles 
+                      or built from classdict when omitted
     Returns:
-           return a tuple with the constructed dictionaries for program courses, 
-           class lists and prerequisites.
+           return a list of the students eligible for the course
     '''
-    eligiblestudents=set()
+    if rosterindex is None and isinstance(classdict,RosterSets) and 'eligible' in classdict.rosterindex:
+        rosterindex=classdict.rosterindex
+    if rosterindex is None:
+        rosterindex=buildEligibility(buildRosterIndex(classdict),programdict,prereqdict)
     
     if coursecode in programdict.keys():
-        #creating all student list
-        for values in classdict.values():
-            eligiblestudents = eligiblestudents.union(values)
-        
-        #checking if already taken the course and eliminating those students
-        eligiblestudents = eligiblestudents.difference(classdict[coursecode])
-        
-        #checking prereq qualification and making the final list of eligible students
-        
-        if coursecode in prereqdict.keys():
-            for prereq in prereqdict[coursecode]:
-                eligiblestudents = eligiblestudents.intersection(classdict[prereq])
-        
-        return list(eligiblestudents)
-        
+        return decodeRoster(rosterindex,rosterindex['eligible'][coursecode])
         
     else:
         return list(set())
 
+def eligibleCourses(student,rosterindex):
+    ''' function used to find the program courses a student is eligible to take next
+    Parameters: 
+        student - student number as written in the class files
+        rosterindex - roster index of the class lists from initFromFiles
+    Returns:
+           return a sorted list of course codes, empty for an unknown student
+    '''
+    if student not in rosterindex['position']:
+        return []
+    
+    studentbit=1<<rosterindex['position'][student]
+    return sorted(coursecode for coursecode,eligiblebits in rosterindex['eligible'].items()
+                  if eligiblebits & studentbit)
+
+def eligibilityCounts(rosterindex):
+    ''' function used to count the eligible students of every program course in one pass
+    Parameters: 
+        rosterindex - roster index of the class lists from initFromFiles
+    Returns:
+           return a dictionary with the course code as key and the number of eligible students as value
+    '''
+    return {coursecode:eligiblebits.bit_count() 
+            for coursecode,eligiblebits in rosterindex['eligible'].items()}
+
+def answerQuery(request,enrollment):
+    ''' function answers one line of the service protocol:
+        "course <coursecode>" lists the eligible students of a course,
+        "student <studentnumber>" lists the courses a student is eligible for,
+        "counts" gives the number of eligible students of every course
+    Parameters: 
+        request - request line without the line end
+        enrollment - tuple returned by initFromFiles
+    Returns:
+           return the JSON answer as a bytes line
+    '''
+    programdict,classdict,prereqdict=enrollment
+    rosterindex=classdict.rosterindex
+    words=request.split()
+    
+    if len(words)==2 and words[0]=='course':
+        eligiblestudents=estimateClass(words[1],programdict,classdict,prereqdict,rosterindex)
+        answer={'course':words[1],'title':programdict.get(words[1]),
+                'count':len(eligiblestudents),'students':eligiblestudents}
+    elif len(words)==2 and words[0]=='student':
+        answer={'student':words[1],'courses':eligibleCourses(words[1],rosterindex)}
+    elif words==['counts']:
+        answer={'counts':eligibilityCounts(rosterindex)}
+    else:
+        answer={'error':'Unknown request '+request}
+    return (json.dumps(answer)+'\n').encode()
+
+def answerKey(request,enrollment):
+    ''' function gives the cache key of a request line, the same for requests differing only 
+        in spacing. Only requests for a known course or student and "counts" have a key.
+    Parameters: 
+        request - request line without the line end
+        enrollment - tuple returned by initFromFiles
+    Returns:
+           return the key as a string, None when the answer is not to be cached
+    '''
+    programdict,classdict,prereqdict=enrollment
+    words=request.split()
+    if len(words)==2 and words[0]=='course' and words[1] in programdict:
+        return ' '.join(words)
+    if len(words)==2 and words[0]=='student' and words[1] in classdict.rosterindex['position']:
+        return ' '.join(words)
+    if words==['counts']:
+        return 'counts'
+    return None
+
+async def refreshEnrollment(service):
+    ''' function reloads the enrollment data and empties the answer cache when any file in the
+        folder changed, checking the folder at most once per check interval
+    Parameters: 
+        service - dictionary with the state of the running service
+    Returns:
+          The function does not return anything
+    '''
+    now=time.monotonic()
+    if now-service['checked']<service['checkinterval']:
+        return
+    service['checked']=now
+    
+    manifest=await asyncio.to_thread(folderManifest,service['folderpath'])
+    if manifest!=service['manifest']:
+        #a failed reload is tried again only after the next change to the folder
+        service['manifest']=manifest
+        #the snapshot makes the reload parse only the changed files
+        service['enrollment']=await asyncio.to_thread(initFromFiles,service['folder'],
+                                                      service['basepath'],snapshot=True)
+        service['cache'].clear()
+
+async def answerBatches(service,queue):
+    ''' function answers the queued requests in batches, so concurrent requests share one 
+        change check and each distinct request of a batch is computed once. The answers for 
+        known courses and students are kept in a cache dropping the least recently used ones. 
+        When the reload fails the last loaded data keeps being served, a request that fails 
+        is answered with its error.
+    Parameters: 
+        service - dictionary with the state of the running service
+        queue - asyncio queue of tuples of request line and future for the answer
+    Returns:
+          The function does not return anything
+    '''
+    cache=service['cache']
+    while True:
+        batch=[await queue.get()]
+        #letting the other clients queue their requests before answering
+        await asyncio.sleep(service['batchdelay'])
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+        
+        try:
+            await refreshEnrollment(service)
+        except Exception as error:
+            print('Reloading failed, answering from the last loaded data:',error)
+        
+        answers={}
+        for request,answer in batch:
+            if request not in answers:
+                try:
+                    key=answerKey(request,service['enrollment'])
+                    if key in cache:
+                        cache.move_to_end(key)
+                        answers[request]=cache[key]
+                    else:
+                        answers[request]=answerQuery(request,service['enrollment'])
+                        if key is not None:
+                            cache[key]=answers[request]
+                            if len(cache)>service['cachesize']:
+                                cache.popitem(last=False)
+                except Exception as error:
+                    answers[request]=(json.dumps({'error':type(error).__name__+': '+str(error)})+'\n').encode()
+            #the future is cancelled when its client went away
+            if not answer.done():
+                answer.set_result(answers[request])
+
+async def serveEnrollment(folder,basepath=None,host=SERVER_HOST,port=SERVER_PORT,
+                          checkinterval=1.0,batchdelay=0.0,cachesize=ANSWER_CACHE_SIZE):
+    ''' function loads the enrollment data once and answers eligibility queries from
+        other programs over a local socket, one request and one JSON answer per line
+    Parameters: 
+        folder - defining the subfolder with the files
+        basepath - folder containing folder, the current working directory when omitted
+        host - address to listen on
+        port - port to listen on
+        checkinterval - seconds between checks of the folder for changed files
+        batchdelay - seconds to wait for more requests before answering a batch
+        cachesize - number of answers kept for repeated requests
+    Returns:
+          The function does not return anything, it runs until cancelled
+    '''
+    if basepath is None:
+        basepath=os.getcwd()
+    folderpath=os.path.join(basepath,folder)
+    
+    service={'folder':folder,'basepath':basepath,'folderpath':folderpath,
+             'manifest':folderManifest(folderpath),'checked':time.monotonic(),
+             'checkinterval':checkinterval,'batchdelay':batchdelay,
+             'cache':OrderedDict(),'cachesize':cachesize}
+    service['enrollment']=initFromFiles(folder,basepath,snapshot=True)
+    queue=asyncio.Queue()
+    
+    async def handleClient(reader,writer):
+        loop=asyncio.get_running_loop()
+        try:
+            while True:
+                line=await reader.readline()
+                if not line:
+                    break
+                request=line.decode(errors='replace').strip()
+                if '\ufffd' in request:
+                    #answering undecodable bytes right away, they are no valid request
+                    writer.write((json.dumps({'error':'Request is not valid UTF-8'})+'\n').encode())
+                else:
+                    answer=loop.create_future()
+                    await queue.put((request,answer))
+                    writer.write(await answer)
+                await writer.drain()
+        finally:
+            writer.close()
+    
+    batcher=asyncio.create_task(answerBatches(service,queue))
+    server=await asyncio.start_server(handleClient,host,port)
+    print('Serving eligibility queries on',host,port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+async def loadTest(requests,host=SERVER_HOST,port=SERVER_PORT,clients=16,count=1000,seed=0):
+    ''' function sends requests to a running service from several concurrent clients
+        and measures the latency of every answer
+    Parameters: 
+        requests - list of request lines to pick from at random
+        host - address of the service
+        port - port of the service
+        clients - number of concurrent connections
+        count - number of requests sent by each client
+        seed - seed of the random request choice
+    Returns:
+          returns a dictionary with the number of requests, the p50 and p99 latency 
+          in milliseconds and the throughput in requests per second
+    '''
+    latencies=[]
+    
+    async def runClient(clientnum):
+        chooser=random.Random(seed+clientnum)
+        reader,writer=await asyncio.open_connection(host,port)
+        try:
+            for num in range(count):
+                start=time.perf_counter()
+                writer.write((chooser.choice(requests)+'\n').encode())
+                await writer.drain()
+                await reader.readline()
+                latencies.append(time.perf_counter()-start)
+        finally:
+            writer.close()
+    
+    start=time.perf_counter()
+    await asyncio.gather(*(runClient(clientnum) for clientnum in range(clients)))
+    elapsed=time.perf_counter()-start
+    
+    latencies.sort()
+    percentile=lambda fraction: latencies[min(len(latencies)-1,int(fraction*len(latencies)))]*1000
+    return {'requests':len(latencies),'p50':percentile(0.50),'p99':percentile(0.99),
+            'throughput':len(latencies)/elapsed}
+
+def serveMain(args):
+    '''function used to run the eligibility service
+    Parameters: 
+        args - command line arguments: the subfolder with the files and optionally the port
+    Returns: Nil
+    '''
+    port=int(args[1]) if len(args)>1 else SERVER_PORT
+    try:
+        asyncio.run(serveEnrollment(args[0],port=port))
+    except KeyboardInterrupt:
+        pass
+
+def loadTestMain(args):
+    '''function used to load test a running eligibility service with course queries
+    Parameters: 
+        args - command line arguments: the subfolder with the files, optionally the number 
+               of clients, the number of requests per client and the port
+    Returns: Nil
+    '''
+    clients=int(args[1]) if len(args)>1 else 16
+    count=int(args[2]) if len(args)>2 else 1000
+    port=int(args[3]) if len(args)>3 else SERVER_PORT
+    
+    #asking for the courses of every program file in the folder
+    folderpath=os.path.join(os.getcwd(),args[0])
+    requests=['course '+coursecode for coursecode in processProgramFiles(folderpath,programFileNames(folderpath))]
+    
+    result=asyncio.run(loadTest(requests,port=port,clients=clients,count=count))
+    print('Requests:',result['requests'])
+    print('Latency p50: %.3f ms  p99: %.3f ms' % (result['p50'],result['p99']))
+    print('Throughput: %.0f requests/s' % result['throughput'])
+
 def main():
     '''function used to get user input like folder name and coursecode
     parameter: Nil
@@ -150,7 +853,9 @@ def main():
     #user inputs for the corresponding folder
     folder=input('Please enter the name of the subfolder with files:')
     
-    programdict,classdict,prereqdict= initFromFiles(folder)
+    timings={}
+    programdict,classdict,prereqdict= initFromFiles(folder,timings=timings,snapshot=True)
+    print('Loading time:',', '.join('%s %.3f s' % (phase,seconds) for phase,seconds in timings.items()))
     
     #recursive input for coursecode and printing output
     coursecode=0
@@ -166,5 +871,10 @@ def main():
                 
         
         
-main()
-        
\ No newline at end of file
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--serve':
+        serveMain(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--loadtest':
+        loadTestMain(sys.argv[2:])
+    else:
+        main()
@@ -8,11 +8,20 @@ The program generates an time wise order summary for a coffee shop
 This includes text processing and calculations
 '''
 
-import orderlog
-ORDERS = orderlog.orderlst
+import csv
+import functools
+import gzip
+import itertools
+import math
+import shutil
+import sys
+import time
+import numpy as np
 
 OPEN=360 #Store opening time in minutes
 CLOSE=1440 #Store closing time in minutes
+CUBE_RESOLUTION=1 #Length of a time slot of the order cube in seconds
+ORDER_BATCH=65536 #Number of orders parsed at a time
 
 def labelString(int_num,OPEN,interval):
     '''Function produces a string of the required time interval like '6:00 - 6:59'
@@ -24,109 +33,585 @@ def labelString(int_num,OPEN,interval):
         a string defining the start and end time of the interval, as shown above
     '''
     
-    interval_count = int((CLOSE-OPEN)/interval)
-    interval_duration = (CLOSE-OPEN)/interval_count
-    starttime=int(OPEN+(int_num*interval_duration))
-    endtime=int(starttime+interval_duration)
-    starttime_hour = starttime//60
-    starttime_min = starttime%60
-    endtime_hour = (endtime-1)//60
-    endtime_min = (endtime-1)%60
-    s=str(starttime_hour)+':'+str(starttime_min).zfill(2)+' - '+str(endtime_hour)+':'+str(endtime_min).zfill(2)
-    return s 
+    return labelTable(OPEN,CLOSE,interval)[int_num]
 
-def composeOrderMatrix(days=31, interval=60):
+@functools.lru_cache(maxsize=None)
+def labelTable(OPEN,CLOSE,interval):
+    '''Function produces the strings of all time intervals like '6:00 - 6:59', computed once
+        for each opening time, closing time and interval length and shared by all printing functions.
+        When the interval does not divide the opening hours, the last interval ends at closing time.
+        Each label runs from the first to the last whole minute inside the interval, so labels of 
+        fractional intervals like 7.5 minutes do not overlap.
+    Parameters: 
+        OPEN - Store opening time in minutes calculated from midnight
+        CLOSE - Store closing time in minutes calculated from midnight
+        interval - length of the time interval for each line item in the output
+    Returns:
+        a tuple of strings, one per interval
+    '''
+    
+    labels = []
+    for int_num in range(intervalCount(interval,OPEN,CLOSE)):
+        starttime = math.ceil(OPEN+int_num*interval)
+        endtime = math.ceil(min(OPEN+(int_num+1)*interval,CLOSE))
+        starttime_hour = starttime//60
+        starttime_min = starttime%60
+        endtime_hour = (endtime-1)//60
+        endtime_min = (endtime-1)%60
+        labels.append(str(starttime_hour)+':'+str(starttime_min).zfill(2)+' - '+str(endtime_hour)+':'+str(endtime_min).zfill(2))
+    return tuple(labels)
+
+def intervalCount(interval,OPEN=OPEN,CLOSE=CLOSE):
+    '''Function computes the number of time intervals between the opening and closing time,
+        counting a shorter last interval when the interval does not divide the opening hours
+    Parameters: 
+        interval - length of the time interval in minutes
+        OPEN - Store opening time in minutes. Default value is the module OPEN.
+        CLOSE - Store closing time in minutes. Default value is the module CLOSE.
+    Returns:
+        the number of intervals, each a row of the order summary matrix
+    '''
+    return math.ceil(round((CLOSE-OPEN)/interval,9))
+
+def readOrderLog(filepath, header=True):
+    '''Generator reading an order log file one record at a time, the file may be gzip compressed.
+        Each line holds the fields of one order, separated by commas, the timestamp first.
+    Parameters: 
+        filepath - path of the order log file
+        header - True when the first line of the file is a header line to be skipped
+    Returns:
+        yields the order records as lists of str
+    '''
+    with open(filepath,'rb') as logfile:
+        compressed = logfile.read(2) == b'\x1f\x8b'
+    
+    if compressed:
+        logfile = gzip.open(filepath,'rt',newline='')
+    else:
+        logfile = open(filepath,'r',newline='')
+    
+    with logfile:
+        records = csv.reader(logfile)
+        if header:
+            next(records,None)
+        for record in records:
+            if record:
+                yield record
+
+def orderLogRecords(filepath=None):
+    '''Function gives the order records without the header line, streamed from an order log file, 
+        or taken from the orderlog module when no file is given.
+    Parameters: 
+        filepath - path of the order log file. Default value is None, using the orderlog module.
+    Returns:
+        an iterator over the order records
+    '''
+    if filepath is None:
+        import orderlog
+        return itertools.islice(orderlog.orderlst,1,None)
+    return readOrderLog(filepath)
+
+def orderBatches(orders):
+    '''Generator splitting the order records into lists of at most ORDER_BATCH records,
+        so that only one batch is held in memory at a time.
+    Parameters: 
+        orders - iterable of order records
+    Returns:
+        yields lists of order records
+    '''
+    orders = iter(orders)
+    batch = list(itertools.islice(orders,ORDER_BATCH))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(orders,ORDER_BATCH))
+
+def parseOrderStamps(orders):
+    '''Function parses the timestamps of the orders in a single vectorized step.
+    Parameters: 
+        orders - iterable of order records, the first field being a timestamp like '2019-10-01 06:01:23'
+    Returns:
+        an array of datetime64 timestamps, one per order
+    '''
+    return np.array([order[0] for order in orders],dtype='datetime64[s]')
+
+def parseOrderTimes(orders, month=None):
+    '''Function parses the timestamps of the orders in a single vectorized step. The orders must
+        all fall in the same month, otherwise the orders of different months would share a day of month.
+    Parameters: 
+        orders - iterable of order records, the first field being a timestamp like '2019-10-01 06:01:23'
+        month - the month of the orders parsed before. Default value is None, any month.
+    Returns:
+        a tuple of arrays with the day of month and the time in seconds from midnight of each order,
+        and the month of the orders. Raises ValueError when the orders span more than one month.
+    '''
+    stamps = parseOrderStamps(orders)
+    months = stamps.astype('datetime64[M]')
+    if len(stamps):
+        low,high = months.min(),months.max()
+        if month is not None:
+            low,high = min(low,month),max(high,month)
+        if low != high:
+            raise ValueError('Orders span '+str(low)+' to '+str(high)+', use composeDateRangeMatrix() to keep the months apart')
+        month = low
+    
+    days = (stamps.astype('datetime64[D]')-months).astype(np.int64)+1
+    seconds = (stamps-stamps.astype('datetime64[D]')).astype(np.int64)
+    return days,seconds,month
+
+def composeOrderMatrix(days=31, interval=60, orders=None):
     '''Creates a two-dimensional list, representing the order summary matrix.
         With the days wise order recieved in the each time interval as inputed by user.
+        The orders are counted by composeDateRangeMatrix(), orders outside the opening hours are 
+        left out of the matrix.
     Parameters:
         days - number of days for which the order summary to be created. Default value is 31.
         interval - length of the time interval for each line item in the output. Default value is 60.
+        orders - iterable of order records, read one batch at a time. Default value is 
+                 orderLogRecords().
     Returns:
-        a two-dimensional list, representing the order summary matrix
-    '''
-    #creating a empty matrix
-    interval_count=int((CLOSE-OPEN)/interval)
-    matrix = [[0 for i in range(days)] for j in range(interval_count)]
-    del ORDERS[0]
-    
-    #Counting number of order day wise & time interval wise
-    for ordernum in ORDERS:
-        date,time=ordernum[0].split()
-        year,month,day = date.split('-')
-        hours,mins,sec = time.split(':')
-        ordersum=0
-        if int(day)<=days:
-            ordertime = (int(hours)*60)+int(mins)+(int(sec)/60)
-            orderint = [int(i) for i in ordernum[3:]]
-            
-            interval_num = (ordertime-OPEN)//interval
-            matrix[int(interval_num)][int(day)-1]+=1 
+        a two-dimensional list, representing the order summary matrix. Raises ValueError when 
+        the orders span more than one month.
+    '''
+    dates,matrix,overflow = composeDateRangeMatrix(interval,orders)
+    matrix,overflow = monthMatrix(dates,matrix,overflow,days)
              
-    return matrix
+    return matrix.tolist()
+
+def composeDateRangeMatrix(interval=60, orders=None, firstdate=None, lastdate=None):
+    '''Creates the order summary matrix with one column per calendar date, so that orders of
+        different months and years are kept apart. Orders outside the opening hours are counted
+        in a separate overflow row.
+    Parameters:
+        interval - length of the time interval for each line item in the output. Default value is 60.
+        orders - iterable of order records, read one batch at a time. Default value is 
+                 orderLogRecords().
+        firstdate - first date of the matrix, like '2019-10-01'. Default value is None, the date 
+                    of the earliest order. Orders before it are not counted.
+        lastdate - last date of the matrix. Default value is None, the date of the latest order.
+                   Orders after it are not counted.
+    Returns:
+        a tuple with the array of dates, the two-dimensional array of order counts with one row 
+        per interval and one column per date, and the array of out of hours orders per date
+    '''
+    if orders is None:
+        orders = orderLogRecords()
+    interval_count=intervalCount(interval)
+    
+    start = None if firstdate is None else np.datetime64(firstdate,'D')
+    end = None if lastdate is None else np.datetime64(lastdate,'D')
+    ndays = 0 if start is None or end is None else max(int((end-start).astype(np.int64))+1,0)
+    matrix = np.zeros((interval_count,ndays),dtype=np.int64)
+    overflow = np.zeros(ndays,dtype=np.int64)
+    
+    for batch in orderBatches(orders):
+        stamps = parseOrderStamps(batch)
+        orderdate = stamps.astype('datetime64[D]')
+        ordersec = (stamps-orderdate).astype(np.int64)
+        
+        #growing the date range to cover the batch when it is not fixed
+        if firstdate is None or lastdate is None:
+            low = orderdate.min() if firstdate is None else start
+            high = orderdate.max() if lastdate is None else end
+            before = 0
+            if matrix.shape[1]:
+                low,high = min(low,start),max(high,start+matrix.shape[1]-1)
+                before = int((start-low).astype(np.int64))
+            after = max(int((high-low).astype(np.int64))+1-before-matrix.shape[1],0)
+            matrix = np.pad(matrix,((0,0),(before,after)))
+            overflow = np.pad(overflow,(before,after))
+            start = low
+        
+        ndays = matrix.shape[1]
+        datenum = (orderdate-start).astype(np.int64)
+        indates = (datenum >= 0) & (datenum < ndays)
+        interval_num = np.floor((ordersec/60-OPEN)/interval).astype(np.int64)
+        inhours = (interval_num >= 0) & (interval_num < interval_count)
+        
+        counted = indates & inhours
+        matrix += np.bincount(interval_num[counted]*ndays+datenum[counted],minlength=interval_count*ndays).reshape(interval_count,ndays)
+        overflow += np.bincount(datenum[indates & ~inhours],minlength=ndays)
+    
+    dates = np.array([],dtype='datetime64[D]') if start is None else start+np.arange(matrix.shape[1])
+    
+    return dates,matrix,overflow
 
-def printOrderSummaryMatrix(matrix,interval=60):
+def monthMatrix(dates, matrix, overflow, days=31):
+    '''Function lays out the order summary from composeDateRangeMatrix() with one column per day of 
+        month, starting at day 1, like the matrix returned from composeOrderMatrix().
+    Parameters:
+        dates - the array of dates returned from composeDateRangeMatrix()
+        matrix - the order counts returned from composeDateRangeMatrix()
+        overflow - the out of hours order counts returned from composeDateRangeMatrix()
+        days - number of days in the order summary. Default value is 31.
+    Returns:
+        a tuple with the two-dimensional array of order counts and the array of out of hours orders, 
+        one column per day. Raises ValueError when the dates span more than one month.
+    '''
+    daymatrix = np.zeros((matrix.shape[0],days),dtype=np.int64)
+    dayoverflow = np.zeros(days,dtype=np.int64)
+    if len(dates) == 0:
+        return daymatrix,dayoverflow
+    
+    months = dates.astype('datetime64[M]')
+    if months[0] != months[-1]:
+        raise ValueError('Orders span '+str(months[0])+' to '+str(months[-1])+', use composeDateRangeMatrix() to keep the months apart')
+    
+    firstday = int((dates[0]-months[0]).astype(np.int64))
+    columns = max(min(len(dates),days-firstday),0)
+    daymatrix[:,firstday:firstday+columns] = matrix[:,:columns]
+    dayoverflow[firstday:firstday+columns] = overflow[:columns]
+    return daymatrix,dayoverflow
+
+class OrderCounter:
+    '''Keeps the order summary matrix up to date while orders come in, so that it can be
+        printed at any time without counting the orders again. Like composeDateRangeMatrix() 
+        there is one column per calendar date, growing as orders of new dates come in, so a 
+        followed order log keeps being counted across the end of a month. Only the most recent 
+        dates are kept.
+    '''
+    
+    def __init__(self, days=31, interval=60):
+        '''Creates an empty order summary matrix.
+        Parameters:
+            days - number of most recent dates kept in the order summary. Default value is 31.
+            interval - length of the time interval for each line item in the output. Default value is 60.
+        '''
+        self.days = days
+        self.interval = interval
+        self.matrix = np.zeros((intervalCount(interval),0),dtype=np.int64)
+        #orders outside the opening hours, per date
+        self.overflow = np.zeros(0,dtype=np.int64)
+        #date of the first column, set by the first order
+        self.start = None
+        #number of malformed records and orders older than the kept dates
+        self.skipped = 0
+    
+    def dates(self):
+        '''Gives the dates of the matrix columns.
+        Returns:
+            an array of dates, one per column of the matrix
+        '''
+        if self.start is None:
+            return np.array([],dtype='datetime64[D]')
+        return self.start+np.arange(self.matrix.shape[1])
+    
+    def extendDates(self, low, high):
+        '''Grows the matrix to cover the dates from low to high, dropping the oldest dates when 
+            more than days dates would be kept.
+        Parameters:
+            low - earliest date of the new orders
+            high - latest date of the new orders
+        '''
+        first,last = low,high
+        if self.start is not None:
+            first,last = min(first,self.start),max(last,self.start+self.matrix.shape[1]-1)
+        first = max(first,last-(self.days-1))
+        if first == self.start and int((last-first).astype(np.int64))+1 == self.matrix.shape[1]:
+            return
+        
+        matrix = np.zeros((self.matrix.shape[0],int((last-first).astype(np.int64))+1),dtype=np.int64)
+        overflow = np.zeros(matrix.shape[1],dtype=np.int64)
+        if self.start is not None:
+            #copying the counts of the dates still kept
+            olddates = (self.dates()-first).astype(np.int64)
+            kept = olddates >= 0
+            matrix[:,olddates[kept]] = self.matrix[:,kept]
+            overflow[olddates[kept]] = self.overflow[kept]
+        self.matrix,self.overflow,self.start = matrix,overflow,first
+    
+    def addOrder(self, order):
+        '''Counts a single order.
+        Parameters:
+            order - an order record, the first field being a timestamp like '2019-10-01 06:01:23'
+        Returns:
+            True when the order falls inside the opening hours and was counted. Orders older than 
+            the kept dates are counted in skipped. Raises ValueError when the timestamp is malformed.
+        '''
+        #parsed like addOrders() does
+        stamp = np.datetime64(order[0],'s')
+        if np.isnat(stamp):
+            raise ValueError('Malformed order timestamp '+repr(order[0]))
+        
+        orderdate = stamp.astype('datetime64[D]')
+        self.extendDates(orderdate,orderdate)
+        datenum = int((orderdate-self.start).astype(np.int64))
+        ordersec = int((stamp-orderdate).astype(np.int64))
+        interval_num = int((ordersec/60-OPEN)//self.interval)
+        
+        if datenum < 0:
+            self.skipped += 1
+            return False
+        if 0 <= interval_num < len(self.matrix):
+            self.matrix[interval_num][datenum] += 1
+            return True
+        self.overflow[datenum] += 1
+        return False
+    
+    def addOrders(self, orders):
+        '''Counts a batch of orders, parsing the timestamps of ORDER_BATCH orders at a time.
+        Parameters:
+            orders - iterable of order records
+        Returns:
+            The function does not return anything. Orders older than the kept dates are counted 
+            in skipped. Raises ValueError when a timestamp is malformed, the batches counted before 
+            the failing one are kept.
+        '''
+        interval_count = self.matrix.shape[0]
+        
+        for batch in orderBatches(orders):
+            stamps = parseOrderStamps(batch)
+            if np.isnat(stamps).any():
+                raise ValueError('Malformed order timestamp in the batch')
+            orderdate = stamps.astype('datetime64[D]')
+            ordersec = (stamps-orderdate).astype(np.int64)
+            self.extendDates(orderdate.min(),orderdate.max())
+            
+            ndays = self.matrix.shape[1]
+            datenum = (orderdate-self.start).astype(np.int64)
+            indates = datenum >= 0
+            interval_num = np.floor((ordersec/60-OPEN)/self.interval).astype(np.int64)
+            inhours = (interval_num >= 0) & (interval_num < interval_count)
+            
+            #Counting number of order date wise & time interval wise in a single pass over the batch
+            counted = indates & inhours
+            cells = interval_num[counted]*ndays+datenum[counted]
+            self.matrix += np.bincount(cells,minlength=interval_count*ndays).reshape(interval_count,ndays)
+            self.overflow += np.bincount(datenum[indates & ~inhours],minlength=ndays)
+            self.skipped += int(np.count_nonzero(~indates))
+    
+    def snapshot(self):
+        '''Gives the current order summary matrix, for printOrderSummaryMatrix() and printHistogram().
+            The matrix keeps changing as orders are added, copy it to keep the current counts.
+        Returns:
+            a two-dimensional array, representing the order summary matrix with one column 
+            per date of dates()
+        '''
+        return self.matrix
+
+def followOrderLog(filepath, counter, header=True, poll=1.0):
+    '''Generator following an order log file that is being written, like tail -f. The orders 
+        already in the file and every new order are counted in batches.
+    Parameters:
+        filepath - path of the order log file
+        counter - the OrderCounter updated with the orders
+        header - True when the first line of the file is a header line to be skipped
+        poll - seconds to wait before checking the file again when no new order is found
+    Returns:
+        yields the counter snapshot each time all orders written so far have been counted,
+        malformed records and orders older than the kept dates are left out and counted in 
+        counter.skipped
+    '''
+    with open(filepath,'r',newline='') as logfile:
+        partial = ''
+        updated = False
+        while True:
+            lines = list(itertools.islice(logfile,ORDER_BATCH))
+            if lines:
+                lines[0] = partial+lines[0]
+                partial = ''
+                #a last line without its newline is still being written
+                if not lines[-1].endswith('\n'):
+                    partial = lines.pop()
+                #the header is skipped once it has been written completely
+                if header and lines:
+                    lines.pop(0)
+                    header = False
+                if lines:
+                    followOrders([order for order in csv.reader(lines) if order],counter)
+                    updated = True
+            
+            if len(lines) < ORDER_BATCH:
+                if updated:
+                    yield counter.snapshot()
+                    updated = False
+                else:
+                    time.sleep(poll)
+
+def followOrders(orders, counter):
+    '''Function counts a batch of orders read from a followed order log. When the batch holds a 
+        malformed record, the orders are counted one at a time so only those records are left out.
+    Parameters:
+        orders - list of order records
+        counter - the OrderCounter updated with the orders
+    Returns:
+        The function does not return anything
+    '''
+    try:
+        counter.addOrders(orders)
+    except ValueError:
+        for order in orders:
+            try:
+                counter.addOrder(order)
+            except (ValueError,IndexError):
+                counter.skipped += 1
+
+def buildOrderCube(orders=None, resolution=CUBE_RESOLUTION):
+    '''Creates the order cube, holding for every calendar date the running count of orders
+        at each time slot of the opening hours. Any interval and day range can be taken from it
+        with orderMatrixFromCube() without reading the orders again. Like composeDateRangeMatrix() 
+        there is one row per date from the earliest to the latest order.
+    Parameters:
+        orders - iterable of order records, read one batch at a time. Default value is 
+                 orderLogRecords().
+        resolution - length of a time slot in seconds. Default value is CUBE_RESOLUTION.
+    Returns:
+        a tuple with the array of dates, the two-dimensional array with one row per date, column k 
+        holding the number of orders of that date in the first k time slots, and the array of 
+        out of hours orders per date
+    '''
+    if orders is None:
+        orders = orderLogRecords()
+    slot_count = -(-(CLOSE-OPEN)*60//resolution)
+    
+    start = None
+    cube = np.zeros((0,slot_count+1),dtype=np.int64)
+    overflow = np.zeros(0,dtype=np.int64)
+    for batch in orderBatches(orders):
+        stamps = parseOrderStamps(batch)
+        orderdate = stamps.astype('datetime64[D]')
+        ordersec = (stamps-orderdate).astype(np.int64)
+        
+        #growing the date range to cover the batch, like composeDateRangeMatrix()
+        low,high = orderdate.min(),orderdate.max()
+        before = 0
+        if start is not None:
+            low,high = min(low,start),max(high,start+len(cube)-1)
+            before = int((start-low).astype(np.int64))
+        after = int((high-low).astype(np.int64))+1-before-len(cube)
+        cube = np.pad(cube,((before,after),(0,0)))
+        overflow = np.pad(overflow,(before,after))
+        start = low
+        
+        datenum = (orderdate-start).astype(np.int64)
+        slot_num = (ordersec-OPEN*60)//resolution
+        counted = (slot_num >= 0) & (slot_num < slot_count)
+        
+        cells = datenum[counted]*slot_count+slot_num[counted]
+        cube[:,1:] += np.bincount(cells,minlength=len(cube)*slot_count).reshape(len(cube),slot_count)
+        overflow += np.bincount(datenum[~counted],minlength=len(cube))
+    
+    dates = np.array([],dtype='datetime64[D]') if start is None else start+np.arange(len(cube))
+    
+    return dates,np.cumsum(cube,axis=1),overflow
+
+def orderMatrixFromCube(cube, days=31, interval=60, firstday=1, resolution=CUBE_RESOLUTION):
+    '''Creates the order summary matrix from the order cube, using the differences of the running 
+        counts at the interval boundaries.
+    Parameters:
+        cube - the order cube returned from buildOrderCube()
+        days - number of days in the order summary. Default value is 31.
+        interval - length of the time interval in minutes, the intervals starting on time slots. Default value is 60.
+        firstday - number of the first day of the matrix, 1 for the first date of the cube. 
+                   Default value is 1.
+        resolution - length of a time slot of the cube in seconds. Default value is CUBE_RESOLUTION.
+    Returns:
+        a two-dimensional list, representing the order summary matrix. Raises ValueError when 
+        the days are not all in the cube or an interval does not start on a time slot.
+    '''
+    if firstday < 1 or days < 0 or firstday-1+days > len(cube):
+        raise ValueError('Days '+str(firstday)+' to '+str(firstday-1+days)+' are outside the '+str(len(cube))+' days of the order cube')
+    
+    #numbering the intervals of every second of the time slots like composeDateRangeMatrix() does
+    slot_count = cube.shape[1]-1
+    ordersec = OPEN*60+np.arange(slot_count*resolution)
+    interval_num = np.floor((ordersec/60-OPEN)/interval).astype(np.int64).reshape(slot_count,resolution)
+    if (interval_num != interval_num[:,:1]).any():
+        raise ValueError('interval must start on the '+str(resolution)+' second time slots')
+    
+    boundaries = np.searchsorted(interval_num[:,0],np.arange(intervalCount(interval)+1))
+    runningcounts = cube[firstday-1:firstday-1+days][:,boundaries]
+    
+    return np.diff(runningcounts,axis=1).T.tolist()
+
+def summaryLayout(dates, matrix, overflow):
+    '''Function lays out the order summary of calendar dates for printing. The orders of a single 
+        month keep the day of month columns of monthMatrix(), several months get one column per date.
+    Parameters:
+        dates - the array of dates returned from composeDateRangeMatrix()
+        matrix - the order counts returned from composeDateRangeMatrix()
+        overflow - the out of hours order counts returned from composeDateRangeMatrix()
+    Returns:
+        a tuple with the order counts, the out of hours order counts and the column headings,
+        None for day of month columns
+    '''
+    months = dates.astype('datetime64[M]')
+    if len(dates) and months[0] != months[-1]:
+        return matrix,overflow,[str(date) for date in dates]
+    matrix,overflow = monthMatrix(dates,matrix,overflow)
+    return matrix,overflow,None
+
+def printOrderSummaryMatrix(matrix,interval=60,columns=None,overflow=None):
     '''The function should display the content of the matrix as shown 
         in the interaction, with the exact formatting.
+        The whole table is built first and written to the output in a single call.
     Parameters:
         matrix - a two dimensional matrix to be printed in the exact format as required
         interval - length of the time interval for each line item in the output.
+        columns - optional column headings, e.g. the dates from composeDateRangeMatrix(). 
+                  Default value is None, numbering the columns from 1.
+        overflow - optional out of hours order counts, printed as a last row
     Returs:
         The function does not return anything
     '''
-    #Finding max rowlen for printing in format
-    rowlen=[16 for row in range(len(matrix))]
-    for i in range(len(matrix)):#no of rows
-        for j in range(len(matrix[i])):# no of columns
-            rowlen[i] += len(str(matrix[i][j]))
-            
-    maxrowlen = max(rowlen) 
-    
-    #Finding max element length in each row
-    maxElementLen = [0 for row in range(len(matrix[0]))]
-    for i in range(len(matrix[0])):
-        maxElementLen[i] = len(str(matrix[0][i]))
-        for j in range(len(matrix)):
-            if maxElementLen[i] < len(str(matrix[j][i])):
-                maxElementLen[i] = len(str(matrix[j][i]))
-               
-    print(('ORDER SUMMARY').center(16+sum(maxElementLen)))
-    print(('TIME \ DAY').center(16),'|',end='')
-    
-    for i in range(len(matrix[0])): print(str(i+1).rjust(maxElementLen[i]),end=' ')
-    print()    
-    for i in range(18+int(1.5*sum(maxElementLen))): print('-',sep='',end='')
-    print()
-      
+    cells = np.asarray(matrix,dtype=np.int64).astype(str)
+    if overflow is not None:
+        cells = np.vstack([cells,np.asarray(overflow,dtype=np.int64).astype(str)])
+    
+    #Finding max element length in each column in one pass
+    maxElementLen = np.char.str_len(cells).max(axis=0)
+    if columns is None:
+        columns = range(1,cells.shape[1]+1)
+    else:
+        maxElementLen = np.maximum(maxElementLen,[len(str(column)) for column in columns])
+    maxElementLen = maxElementLen.tolist()
+    
+    labels = list(labelTable(OPEN,CLOSE,interval)[:len(matrix)])
+    if overflow is not None:
+        labels.append('OUT OF HOURS')
+    
+    lines = [('ORDER SUMMARY').center(16+sum(maxElementLen)),
+             ('TIME \\ DAY').center(16)+' |'+''.join(str(column).rjust(width)+' ' for column,width in zip(columns,maxElementLen)),
+             '-'*(18+int(1.5*sum(maxElementLen)))]
+    
     #Printing the values
-    for i in range(len(matrix)):
-        print((labelString(i,OPEN,interval)).rjust(16),'|',end='')
-        for j in range(len(matrix[i])):
-            print(str(matrix[i][j]).rjust(maxElementLen[j]),end=' ')
-        print()
+    for label,row in zip(labels,cells.tolist()):
+        lines.append(label.rjust(16)+' |'+''.join(cell.rjust(width)+' ' for cell,width in zip(row,maxElementLen)))
+    
+    sys.stdout.write('\n'.join(lines)+'\n')
         
         
-def printHistogram(matrix,histogram_day,interval=60):
+def printHistogram(matrix,histogram_day,interval=60,width=None):
     '''The function displays a histogram time interval wise for the day as inputed by the user.
         The histogram visualizes the numbers from the appropriate column of the matrix using * symbols.
+        Bars too long for the terminal are scaled down, the header then tells how many orders each * stands for.
     Parameters:
         matrix - a two dimensional matrix containing the day wise order summary
         histogram_day - the day inputed by the user for displaying the histogram
         interval - length of the time interval for each line item in the output
+        width - number of characters in an output line. Default value is the terminal width.
     Returns:
         The function does not return anything
     '''
+    counts = np.asarray(matrix,dtype=np.int64)[:,histogram_day]
+    if width is None:
+        width = shutil.get_terminal_size().columns
+    
+    #Scaling the bars to the width available after the labels
+    scale = max(-(-int(counts.max(initial=0))//max(width-18,1)),1)
+    stars = -(-counts//scale)
     
-    maxrowlen = 16+max(i[histogram_day] for i in matrix)
+    maxrowlen = 16+int(stars.max(initial=0))
     
     header='NUMBER OF ORDERS PER '+str(interval)+' min FOR DAY '+str(histogram_day+1)
-    print(header.center(maxrowlen))
-    interval_count=int((CLOSE-OPEN)/interval)
+    if scale > 1:
+        header += ' (* = '+str(scale)+' orders)'
+    lines = [header.center(maxrowlen)]
     
     #Printing * corresponding to the order count
-    for i in range(interval_count):
-        print((labelString(i,OPEN,interval)).rjust(16),'|',end='')
-        for j in range(matrix[i][histogram_day]):print('*',end='')
-        print()  
+    for label,count in zip(labelTable(OPEN,CLOSE,interval),stars.tolist()):
+        lines.append(label.rjust(16)+' |'+'*'*count)
+    
+    sys.stdout.write('\n'.join(lines)+'\n')
     
 def main():
     '''function used to start the program flow, read user input and call other methods as needed
@@ -137,46 +622,85 @@ def main():
     days=eval(input('How many days would you like to include?'))
     interval=eval(input('Please specify the length of the time interval in minutes:'))
     
+    #checking input data, one hour intervals by default
+    if interval <= 0 or interval > 1080: interval = 60
     
-    #checking input data and calling functions accordingly
-    if days <= 0 or days > 31: 
-        
-        if interval < 0 or interval > 1080: 
-            matrix=composeOrderMatrix()
-            printOrderSummaryMatrix(matrix)
-                
-        else:
-            matrix=composeOrderMatrix(interval=interval)
-            printOrderSummaryMatrix(matrix, interval)
+    #an order log file given on the command line is streamed instead of the orderlog module,
+    #reading the orders once so that other intervals are taken from the order cube
+    dates,cube,cubeoverflow=buildOrderCube(orderLogRecords(sys.argv[1] if len(sys.argv) > 1 else None))
+    alldays=days
+    
+    while interval > 0:
+        if interval > 1080: interval = 60
+        matrix=np.array(orderMatrixFromCube(cube,len(dates),interval),dtype=np.int64).reshape(intervalCount(interval),len(dates))
         
-    if 0 < days <= 31:    
-        if interval < 0 or interval > 1080:
-            matrix=composeOrderMatrix(days)
-            printOrderSummaryMatrix(matrix)
+        #the orders of a single month keep the day of month columns, several months get one column per date
+        matrix,overflow,columns=summaryLayout(dates,matrix,cubeoverflow)
         
-        else:        
-            matrix=composeOrderMatrix(days, interval)
-            printOrderSummaryMatrix(matrix, interval)
+        #all days by default
+        days=alldays
+        if days <= 0 or days > matrix.shape[1]: days = matrix.shape[1]
+        matrix,overflow=matrix[:,:days],overflow[:days]
+        if columns: columns=columns[:days]
+        printOrderSummaryMatrix(matrix, interval, columns, overflow if overflow.any() else None)
+    
+        #User inputs for histogram and calling functions
+        histogram_day=0
+        while(histogram_day == 0):
+            histogram_day = eval(input('Enter day number from 1 to '+str(days)+' to see a histogram, or -1 to exit:'))
+            if 0 < histogram_day <= days:
+                printHistogram(matrix,histogram_day-1,interval)
+                
+                histogram_day = 0
+                
+            elif histogram_day < -1 or histogram_day > days:
+                histogram_day = 0
         
-
-    #User inputs for histogram and calling functions
-    histogram_day=0
-    if days <= 0 or days > 31: days = 31
-    while(histogram_day == 0):
-        histogram_day = eval(input('Enter day number from 1 to '+str(days)+' to see a histogram, or -1 to exit:'))
-        if 0 < histogram_day <= days:
-            if 0 < interval <= 1080:
-                printHistogram(matrix,histogram_day-1,interval)  
-            else:
-                printHistogram(matrix,histogram_day-1)
-            
-            histogram_day = 0
-            
-        elif histogram_day < -1 or histogram_day > days:
-            histogram_day = 0
+        #the same orders summed up again for another interval length
+        interval=float(input('Enter another interval length in minutes, or 0 to exit:'))
             
     print('Bye!')
+
+def followMain(args):
+    '''function used to print the order summary again each time new orders are written to the order log
+    Parameters: 
+        args - command line arguments: the order log file and optionally the interval length
+    Returns: Nil
+    '''
+    interval = float(args[1]) if len(args) > 1 else 60
+    counter = OrderCounter(interval=interval)
+    
+    for matrix in followOrderLog(args[0], counter):
+        #a log running into a new month switches to one column per date
+        matrix,overflow,columns = summaryLayout(counter.dates(), matrix, counter.overflow)
+        printOrderSummaryMatrix(matrix, interval, columns, overflow if overflow.any() else None)
+        if counter.skipped:
+            print('Skipped',counter.skipped,'malformed or out of range records')
             
 
-main()
+def dateRangeMain(args):
+    '''function used to print the order summary of every calendar date in the order log, in one pass
+    Parameters: 
+        args - command line arguments: the order log file, optionally the interval length
+               and optionally the first and last date
+    Returns: Nil
+    '''
+    interval = float(args[1]) if len(args) > 1 else 60
+    firstdate = args[2] if len(args) > 2 else None
+    lastdate = args[3] if len(args) > 3 else None
+    
+    dates,matrix,overflow = composeDateRangeMatrix(interval,readOrderLog(args[0]),firstdate,lastdate)
+    if len(dates) == 0:
+        print('No orders found')
+        return
+    
+    printOrderSummaryMatrix(matrix,interval,[str(date) for date in dates],overflow)
+            
 
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--follow':
+        followMain(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--dates':
+        dateRangeMain(sys.argv[2:])
+    else:
+        main()
@@ -13,63 +13,125 @@ import matplotlib as mlp
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import io
 import os
 import os.path
+import sys
+import multiprocessing
+from datacache import readCachedCsv
 
 CITY = 'city'
 PROVINCE = 'province'
 NAME = 'name'
 REVIEWS_RATING = 'reviews_rating'
 
-def pickStateAndCities(hotel):
+#ceiled rating values counted in the rating histogram of every hotel
+RATING_BUCKETS = [1,2,3,4,5]
+HISTOGRAM = ['rating'+str(bucket) for bucket in RATING_BUCKETS]
+#columns of the aggregate table that are added up when reviews are appended
+COUNTS = ['reviewcount','ratingsum']+HISTOGRAM
+
+#column types of the review file parts read separately, so that a part whose hotel names all 
+#look like numbers still gives the same name keys as the rest of the file
+REVIEW_DTYPES = {NAME:str,REVIEWS_RATING:float}
+
+#rating sums are kept as whole numbers of 1/RATING_SCALE rating units, so that adding
+#partial sums gives exactly the same total in any order
+RATING_SCALE = 10**6
+
+def buildLocationIndex(hotel):
+    ''' builds the index of states, their sorted cities and the hotel rows in each city,
+        used to validate selections without scanning the hotel data
+    Parameters: 
+        hotel - A dataframe with information on hotel location 
+    Returns:
+           dictionary with the state as key and a tuple as value, holding the series of sorted 
+           cities numbered from 1 and a dictionary of hotel row positions by city
+    '''
+    
+    locindex = {}
+    for (state,city),rows in sorted(hotel.groupby(by=[PROVINCE,CITY]).indices.items()):
+        if state not in locindex:
+            locindex[state] = ([],{})
+        locindex[state][0].append(city)
+        locindex[state][1][city] = rows
+    
+    for state,(cities,cityrows) in locindex.items():
+        cityoption = pd.Series(cities,index=np.arange(1,len(cities)+1),name=CITY)
+        locindex[state] = (cityoption,cityrows)
+    
+    return locindex
+
+
+def selectStateAndCities(locindex,userstate,citynums):
+    ''' validates a selection of state and city numbers without any user interaction
+    Parameters: 
+        locindex - dictionary returned from function buildLocationIndex()
+        userstate - the chosen state
+        citynums - list of up to four city numbers, as listed in the city options of the state
+    Returns:
+           user chosen state and the selected cities in it, 
+           raises ValueError with the reason when the selection is not valid
+    '''
+    
+    if userstate not in locindex:
+        raise ValueError('We have no data on hotels in '+str(userstate))
+    
+    cityoption = locindex[userstate][0]
+    
+    if len(citynums) > 4:
+        raise ValueError('You selected '+str(len(citynums))+' items, must select up to four')
+    
+    try:
+        citynums = [int(citynum) for citynum in citynums]
+    except ValueError:
+        raise ValueError('Selection must range from 1 to '+str(len(cityoption)))
+    
+    if any(citynum < 1 or citynum > len(cityoption) for citynum in citynums):
+        raise ValueError('Selection must range from 1 to '+str(len(cityoption)))
+    
+    usercity = pd.DataFrame(cityoption[cityoption.index.isin(citynums)])
+    
+    return userstate,usercity
+
+
+def pickStateAndCities(hotel,locindex=None):
     ''' will be used to get user input about state and cities to generate the hotels list 
     Parameters: 
         hotel - A dataframe with information on hotel location 
+        locindex - optional dictionary returned from function buildLocationIndex(), built 
+                   from hotel when not given
     Returns:
            user chosen state and all cities in it 
     '''
     
+    if locindex is None:
+        locindex = buildLocationIndex(hotel)
+    
     userstate = 'nothing'
      
     while(userstate == 'nothing'):
         userstate = input('Please enter state, e.g. MA: ')
-        if (userstate in hotel[PROVINCE].values) == False:
+        if userstate not in locindex:
             print('We have no data on hotels in',userstate)
             userstate = 'nothing'
             
-    cityoption = hotel[hotel[PROVINCE] == userstate][CITY]
-    
-    cityoption = pd.Series(cityoption.unique())
-    cityoption = cityoption.sort_values()
-    cityoption.index = np.arange(1,len(cityoption)+1)
-    cityoption.rename(inplace=True)
+    cityoption = locindex[userstate][0]
     
-    print(cityoption)
+    print(cityoption.rename(None))
     print()
     
-    cityoption.rename(CITY,inplace=True)
-    
     citychecker = 'notokay'
     while (citychecker != 'okay'):
-        citynum = pd.Series(input('Select cities from above list by entering up to four indices on the same line:').split())
-        
-        citynum = citynum.astype('int32')
-        citynum.rename('citynum',inplace=True)
-        
-        comparecity = pd.merge(cityoption,citynum,how='inner',left_index=True,right_on = 'citynum')
+        citynum = input('Select cities from above list by entering up to four indices on the same line:').split()
         
-        if len(comparecity) > 4:
-            print('You selected', len(citynum),'items, must select up to four')
-            
-        elif len(comparecity) != len(citynum):
-            print('Selection must range from 1 to',len(cityoption))
-            
-        elif  len(comparecity) == len(citynum):
+        try:
+            userstate,usercity = selectStateAndCities(locindex,userstate,citynum)
             citychecker = 'okay'
+        except ValueError as error:
+            print(error)
             
-    comparecity[CITY].reindex(citynum.values)
     print('You have selected the following cities:')
-    usercity = pd.DataFrame(cityoption[cityoption.index.isin(citynum.values)])
       
     print(usercity)
     print()
@@ -77,39 +139,309 @@ def pickStateAndCities(hotel):
     return userstate,usercity
     
 
-def selectHotelReviews(hotel,review,usercity,userstate):
+def buildHotelAggregates(review):
+    '''  builds a table with the review count, rating sum, mean rating and rating histogram
+        of every hotel, in a single pass over the reviews
+    Parameters: 
+        review - a dataframe with records of customer reviews of their stays in the hotels
+    Returns:
+           hotelagg - dataframe indexed by hotel name with the columns reviewcount, ratingsum 
+                      (in 1/RATING_SCALE units), Avg_ratings and one column per rating bucket
+    '''
+    
+    codes,names = pd.factorize(review[NAME])
+    ratings = review[REVIEWS_RATING].to_numpy(dtype=float)
+    
+    #reviews without a rating or hotel name are not counted
+    valid = (codes >= 0) & ~np.isnan(ratings)
+    codes = codes[valid]
+    ratings = ratings[valid]
+    
+    reviewcount = np.bincount(codes,minlength=len(names))
+    ratingunits = np.round(ratings*RATING_SCALE)
+    ratingsum = np.bincount(codes,weights=ratingunits,minlength=len(names)).astype(np.int64)
+    
+    buckets = np.ceil(ratings).astype(np.int64)-RATING_BUCKETS[0]
+    inrange = (buckets >= 0) & (buckets < len(RATING_BUCKETS))
+    histogram = np.bincount(codes[inrange]*len(RATING_BUCKETS)+buckets[inrange],
+                            minlength=len(names)*len(RATING_BUCKETS)).reshape(len(names),len(RATING_BUCKETS))
+    
+    return aggregateTable(names,np.column_stack([reviewcount,ratingsum,histogram]))
+
+
+def aggregateTable(names,counts):
+    '''  creates the per hotel aggregate table from the counts of every hotel
+    Parameters: 
+        names - the hotel names
+        counts - integer array with one row per hotel and one column per name in COUNTS
+    Returns:
+           hotelagg - dataframe indexed by hotel name with the columns reviewcount, ratingsum 
+                      (in 1/RATING_SCALE units), Avg_ratings and one column per rating bucket
+    '''
+    
+    counts = np.asarray(counts,dtype=np.int64).reshape(len(names),len(COUNTS))
+    
+    hotelagg = pd.DataFrame(counts[:,2:].copy(),index=pd.Index(names,name=NAME),columns=HISTOGRAM)
+    hotelagg.insert(0,'reviewcount',counts[:,0].copy())
+    hotelagg.insert(1,'ratingsum',counts[:,1].copy())
+    hotelagg.insert(2,'Avg_ratings',hotelagg['ratingsum']/hotelagg['reviewcount'].replace(0,np.nan)/RATING_SCALE)
+    
+    return hotelagg
+
+
+class HotelAggregator:
+    '''Keeps the per hotel review aggregates up to date while new reviews come in. The counts are
+        kept in an array that doubles its capacity when full, and hotels seen for the first time wait 
+        in an append buffer until enough of them are collected to extend the name index, so adding 
+        a batch of reviews costs time proportional to the batch, not to the number of hotels.
+        The aggregator is updated in place, table() gives a copy of the current aggregate table.
+    '''
+    
+    def __init__(self, hotelagg=None):
+        '''Creates the aggregator.
+        Parameters:
+            hotelagg - aggregate table returned from buildHotelAggregates() to start from, it is 
+                       copied and not changed. Default value is None, no reviews.
+        '''
+        if hotelagg is None:
+            hotelagg = buildHotelAggregates(pd.DataFrame({NAME:[],REVIEWS_RATING:[]}))
+        
+        self.names = pd.Index(hotelagg.index,name=NAME)
+        self.size = len(self.names)
+        self.counts = np.zeros((max(self.size,16),len(COUNTS)),dtype=np.int64)
+        self.counts[:self.size] = hotelagg[COUNTS].to_numpy(dtype=np.int64)
+        #hotels added since the name index was last extended, with their row in counts
+        self.pending = {}
+    
+    def appendReviews(self, newreview):
+        '''Adds a batch of new reviews, giving the same aggregates as a full recompute.
+        Parameters:
+            newreview - a dataframe with the new records of customer reviews
+        Returns:
+            The function does not return anything
+        '''
+        self.addAggregates(buildHotelAggregates(newreview))
+    
+    def addAggregates(self, otheragg):
+        '''Adds the counts of an aggregate table, giving the same aggregates as aggregating
+            both sets of reviews together.
+        Parameters:
+            otheragg - dataframe with the per hotel review aggregates to be added
+        Returns:
+            The function does not return anything
+        '''
+        rows = self.names.get_indexer(otheragg.index)
+        
+        #hotels not in the name index are looked up in the append buffer or given a new row
+        for position in np.flatnonzero(rows < 0):
+            name = otheragg.index[position]
+            if name not in self.pending:
+                if self.size == len(self.counts):
+                    self.counts = np.concatenate([self.counts,np.zeros_like(self.counts)])
+                self.pending[name] = self.size
+                self.size += 1
+            rows[position] = self.pending[name]
+        
+        self.counts[rows] += otheragg[COUNTS].to_numpy(dtype=np.int64)
+        
+        #extending the name index once the buffer is a fair share of it, so each hotel is
+        #copied into a new index only a few times on average
+        if len(self.pending) >= max(len(self.names)//4,1024):
+            self.extendNames()
+    
+    def extendNames(self):
+        '''Moves the hotels of the append buffer into the name index.
+        Returns:
+            The function does not return anything
+        '''
+        if self.pending:
+            self.names = self.names.append(pd.Index(list(self.pending),name=NAME))
+            self.pending = {}
+    
+    def table(self):
+        '''Gives the current aggregate table, the same as buildHotelAggregates() on all the reviews.
+        Returns:
+            hotelagg - a new dataframe with the per hotel review aggregates, not changed by later appends
+        '''
+        self.extendNames()
+        return aggregateTable(self.names,self.counts[:self.size])
+
+
+def buildHotelAggregatesChunked(filepath,chunksize=100000,progress=False):
+    '''  builds the per hotel aggregate table by reading the review file in chunks,
+        so that peak memory is set by the chunk size and not by the size of the file
+    Parameters: 
+        filepath - path of the review file
+        chunksize - number of reviews read at a time. Default value is 100000.
+        progress - when True the number of reviews read so far is printed after each chunk
+    Returns:
+           hotelagg - dataframe with the per hotel review aggregates, same as buildHotelAggregates()
+    '''
+    
+    aggregator = HotelAggregator()
+    reviewsread = 0
+    filesize = os.path.getsize(filepath)
+    
+    with open(filepath,'rb') as reviewfile:
+        for chunk in pd.read_csv(reviewfile,usecols=[NAME,REVIEWS_RATING],dtype=REVIEW_DTYPES,chunksize=chunksize):
+            aggregator.appendReviews(chunk)
+            
+            reviewsread += len(chunk)
+            if progress:
+                print('Read',reviewsread,'reviews','('+str(round(100*reviewfile.tell()/max(filesize,1)))+'%)')
+    
+    return aggregator.table()
+
+
+def reviewFileRanges(filepath,rangesize):
+    '''  splits the body of the review file into byte ranges of about the given size, each range 
+        holding whole reviews. A review may span several lines when a quoted field holds a line 
+        break, so a range only ends at a line end with an even number of quote characters before it.
+    Parameters: 
+        filepath - path of the review file
+        rangesize - number of bytes in each range
+    Returns:
+           a tuple with the header line of the file and the list of (start, end) byte ranges
+    '''
+    
+    filesize = os.path.getsize(filepath)
+    rangesize = max(int(rangesize),1)
+    
+    with open(filepath,'rb') as reviewfile:
+        #the header ends at the first line end outside quotes
+        header = b''
+        quotes = 0
+        while True:
+            line = reviewfile.readline()
+            header += line
+            quotes += line.count(b'"')
+            if not line or quotes % 2 == 0:
+                break
+        
+        boundaries = [reviewfile.tell()]
+        while boundaries[-1]+rangesize < filesize:
+            #counting the quotes up to the nominal end of the range, a block at a time
+            remaining = rangesize
+            while remaining > 0:
+                block = reviewfile.read(min(remaining,16*2**20))
+                quotes += block.count(b'"')
+                remaining -= len(block)
+            
+            #moving on to the end of the review cut by the nominal end
+            while True:
+                line = reviewfile.readline()
+                quotes += line.count(b'"')
+                if not line or quotes % 2 == 0:
+                    break
+            
+            if reviewfile.tell() >= filesize:
+                break
+            boundaries.append(reviewfile.tell())
+    
+    return header,list(zip(boundaries,boundaries[1:]+[filesize]))
+
+
+def aggregateReviewRange(task):
+    '''  builds the per hotel aggregates of the reviews in one byte range of the
+        review file. Used by the worker processes of buildHotelAggregatesParallel().
+    Parameters: 
+        task - tuple of the file path, the header line and the start and end of the byte range
+    Returns:
+           dataframe with the per hotel review aggregates of the range
+    '''
+    
+    filepath,header,start,end = task
+    
+    with open(filepath,'rb') as reviewfile:
+        reviewfile.seek(start)
+        body = reviewfile.read(end-start)
+    
+    return buildHotelAggregates(pd.read_csv(io.BytesIO(header+body),usecols=[NAME,REVIEWS_RATING],dtype=REVIEW_DTYPES))
+
+
+def buildHotelAggregatesParallel(filepath,processes=None,rangesize=64*2**20):
+    '''  builds the per hotel aggregate table with a pool of worker processes, each worker
+        aggregating byte ranges of the review file. The ranges are found by one sequential 
+        pass counting quote characters, so reviews with line breaks inside quoted fields stay 
+        whole. The partial tables are merged in file order.
+    Parameters: 
+        filepath - path of the review file
+        processes - number of worker processes. Default value is the number of CPUs.
+        rangesize - number of bytes given to a worker at a time. Default value is 64 MB.
+    Returns:
+           hotelagg - dataframe with the per hotel review aggregates, same as buildHotelAggregates()
+    '''
+    
+    header,ranges = reviewFileRanges(filepath,rangesize)
+    tasks = [(filepath,header,start,end) for start,end in ranges]
+    
+    aggregator = HotelAggregator()
+    
+    with multiprocessing.Pool(processes) as pool:
+        for partialagg in pool.imap(aggregateReviewRange,tasks):
+            aggregator.addAggregates(partialagg)
+    
+    return aggregator.table()
+
+
+def ratingHistograms(hotelagg,hotelnames):
+    '''  looks up the rating histograms of several hotels in the aggregate table
+    Parameters: 
+        hotelagg - dataframe with the per hotel review aggregates returned from buildHotelAggregates()
+        hotelnames - names of the hotels
+    Returns:
+           a tuple of two dataframes with one row per hotel and one column per rating value,
+           holding the review counts and the percentage of reviews with each rating
+    '''
+    
+    hotelrows = hotelagg.loc[hotelnames]
+    
+    counts = pd.DataFrame(hotelrows[HISTOGRAM].to_numpy(dtype=np.int64),index=hotelrows.index,columns=RATING_BUCKETS)
+    percentages = (counts.div(hotelrows['reviewcount'],axis=0).round(3))*100
+    
+    return counts,percentages
+
+
+def selectHotelReviews(hotel,review,usercity,userstate,verbose=True,locindex=None,hotelagg=None):
     '''  to select and return reviews for the hotels in the selected cities 
     Parameters: 
         hotel - A dataframe with information on hotel location 
-        review - a dataframe with records of customer reviews of their stays in the hotels
+        review - a dataframe with records of customer reviews of their stays in the hotels,
+                 may be None when hotelagg is given
         usercity - all the cities selected by user
         userstate - state selected by user for generating the hotel list
+        verbose - when False the selected hotels are not printed
+        locindex - optional dictionary returned from function buildLocationIndex(), used to 
+                   look up the hotel rows instead of filtering the hotel data
+        hotelagg - optional dataframe with the per hotel review aggregates returned from 
+                   buildHotelAggregates(), when given the reviews are not read
     Returns:
            userhotel - the list of hotels in the location selected by user
            avgReview - dataframe with average rating and review count for the hotels in the selected location 
     '''
         
-    userhotel = hotel[(hotel[CITY].isin(usercity[CITY])) & (hotel[PROVINCE] == userstate)]
+    if locindex is None:
+        userhotel = hotel[(hotel[CITY].isin(usercity[CITY])) & (hotel[PROVINCE] == userstate)]
+        
+        userhotel.sort_values(by=CITY,inplace=True)
+    else:
+        cityrows = locindex[userstate][1]
+        rows = [cityrows[city] for city in sorted(usercity[CITY]) if city in cityrows]
+        userhotel = hotel.iloc[np.concatenate(rows) if rows else []]
     
-    userhotel.sort_values(by=CITY,inplace=True)
     userhotel.index = np.arange(0,len(userhotel))
-    print('Displaying rating information for the following hotels:')
-    
-    print(userhotel[[NAME,CITY,PROVINCE]])
-    
-    #calculating data for the reviewrating plot
-    reviewSelectedHotel = pd.merge(review,userhotel,on=NAME)
-     
-    avgReview = reviewSelectedHotel.groupby(by=NAME).mean()[REVIEWS_RATING]
-    
-    reviewcount = reviewSelectedHotel.groupby(by=NAME).count()[REVIEWS_RATING]
-    
-    avgReview = pd.merge(avgReview,reviewcount,on='name')
-    avgReview.columns = ['Avg_ratings','reviewcount']
+    if verbose:
+        print('Displaying rating information for the following hotels:')
+        
+        print(userhotel[[NAME,CITY,PROVINCE]])
     
-    avgReview = pd.merge(avgReview,userhotel[[NAME,CITY]],on = NAME)
+    #looking up the data for the reviewrating plot in the aggregate table
+    if hotelagg is None:
+        hotelagg = buildHotelAggregates(review[review[NAME].isin(userhotel[NAME])])
+    avgReview = pd.merge(hotelagg[['Avg_ratings','reviewcount']],userhotel[[NAME,CITY]],left_index=True,right_on=NAME)
+    avgReview = avgReview[[NAME,'Avg_ratings','reviewcount',CITY]]
     
-    avgReview.sort_values(by='Avg_ratings',inplace=True,ascending=False)
+    avgReview.sort_values(by='Avg_ratings',inplace=True,ascending=False,kind='stable')
     avgReview.reset_index(drop=True,inplace=True)
     
     return userhotel, avgReview
@@ -129,7 +461,7 @@ def  reviewsRatingsPlot(userhotel,avgReview):
     for pro in userhotel[CITY].unique():   
         plt.plot(avgReview[avgReview[CITY] == pro].reviewcount,avgReview[avgReview[CITY] == pro].Avg_ratings,label=pro,marker='o',linestyle='')
         
-    for ele in range(len(userhotel[NAME])):
+    for ele in range(len(avgReview[NAME])):
         plt.annotate(avgReview[NAME][ele],(avgReview.reviewcount[ele],avgReview.Avg_ratings[ele]))
     
     plt.xlabel('Number of reviews')
@@ -142,25 +474,33 @@ def  reviewsRatingsPlot(userhotel,avgReview):
     return avgReview
     
 
-def ratingPercentageBarchart(avgReview,review,userstate):
+def ratingPercentageBarchart(avgReview,review,userstate,hotelagg=None,topN=3):
     '''   Barchart showing what percentage of all reviews have the specific rating (1 through 5). 
-        This chart is generated for each of the top three hotels.
+        This chart is generated for each of the top rated hotels, three by default.
     Parameters:  
         avgReview - dataframe with average rating and review count for the hotels in the selected location
-        review - a dataframe with records of customer reviews of their stays in the hotels
+        review - a dataframe with records of customer reviews of their stays in the hotels,
+                 may be None when hotelagg is given
         userstate - state selected by user for generating the hotel list 
+        hotelagg - optional dataframe with the per hotel review aggregates, when given the
+                   histograms are taken from it instead of the reviews
+        topN - number of top rated hotels to chart. Default value is 3.
     Returns:
-           the function returns nothing
+           the list of created figures
     '''
-    review['ceiledRating'] = review[REVIEWS_RATING].apply(np.ceil) 
+    tophotels = avgReview[NAME][:topN]
     
-    for eachhotel in range(3):
-        tempreviewdata = review[review[NAME] == avgReview[NAME][eachhotel]].groupby(by='ceiledRating').count()
-        tempreviewdata['percentages'] = ((tempreviewdata[REVIEWS_RATING]/tempreviewdata[REVIEWS_RATING].sum()).round(3))*100
-        
-        tempreviewdata = tempreviewdata.reindex([1,2,3,4,5],fill_value = 0)
+    #aggregating the reviews of the top hotels in one pass, without changing review
+    if hotelagg is None:
+        hotelagg = buildHotelAggregates(review[review[NAME].isin(tophotels)])
+    
+    counts,percentages = ratingHistograms(hotelagg,tophotels)
+    
+    figures = []
+    for eachhotel in range(len(tophotels)):
+        tempreviewdata = pd.DataFrame({REVIEWS_RATING:counts.iloc[eachhotel],'percentages':percentages.iloc[eachhotel]})
         
-        plt.figure()
+        figures.append(plt.figure())
         labeltoprint = tempreviewdata['percentages'].round(3).astype(str).str.cat(others=['','','','',''],sep='%')
                 
         plt.bar(x=tempreviewdata.index, height=tempreviewdata['percentages'],align = 'edge')
@@ -175,28 +515,165 @@ def ratingPercentageBarchart(avgReview,review,userstate):
         plt.title(reviewtitle)
         plt.xticks(tempreviewdata.index)
         plt.yticks(range(0,120,20))
+    
+    return figures
+
+
+#data shared by the report worker processes, set once per worker by initReportWorker()
+REPORT_DATA = {}
+
+def allStateSelections(locindex):
+    '''  lists a selection of all cities for every state in the hotel data
+    Parameters: 
+        locindex - dictionary returned from function buildLocationIndex()
+    Returns:
+           list of (state, list of cities) tuples, sorted by state
+    '''
+    
+    return [(state,list(cityoption)) for state,(cityoption,cityrows) in sorted(locindex.items())]
+
+
+def initReportWorker(hotel,hotelagg,locindex):
+    '''  prepares a report worker process, storing the loaded data for all its reports 
+        and switching matplotlib to the non interactive Agg backend
+    Parameters: 
+        hotel - A dataframe with information on hotel location 
+        hotelagg - dataframe with the per hotel review aggregates
+        locindex - dictionary returned from function buildLocationIndex()
+    Returns:
+           the function returns nothing
+    '''
+    
+    plt.switch_backend('Agg')
+    REPORT_DATA['hotel'] = hotel
+    REPORT_DATA['hotelagg'] = hotelagg
+    REPORT_DATA['locindex'] = locindex
+
+
+def renderHotelReport(task):
+    '''  renders the rating plot and the rating barcharts of one state/city selection to files
+    Parameters: 
+        task - tuple of the report number, state, list of cities, output folder, list of 
+               file formats and number of top hotels
+    Returns:
+           list of the written file paths
+    '''
+    
+    reportnum,userstate,cities,outfolder,formats,topN = task
+    hotelagg = REPORT_DATA['hotelagg']
+    
+    userhotel,avgReview = selectHotelReviews(REPORT_DATA['hotel'],None,pd.DataFrame({CITY:cities}),userstate,
+                                            verbose=False,locindex=REPORT_DATA['locindex'],hotelagg=hotelagg)
+    if len(avgReview) == 0:
+        return []
+    
+    figures = [plt.figure()]
+    reviewsRatingsPlot(userhotel,avgReview)
+    figures += ratingPercentageBarchart(avgReview,None,userstate,hotelagg,topN)
+    
+    filenames = []
+    basename = os.path.join(outfolder,str(userstate)+'_'+str(reportnum))
+    for fignum,figure in enumerate(figures):
+        for fileformat in formats:
+            filename = basename+('_ratings' if fignum == 0 else '_hotel'+str(fignum))+'.'+fileformat
+            figure.savefig(filename)
+            filenames.append(filename)
+        plt.close(figure)
+    
+    return filenames
+
+
+def renderHotelReports(hotel,hotelagg,selections,outfolder,formats=('png',),processes=None,topN=3,locindex=None):
+    '''  renders the charts of many state/city selections to image files without any user 
+        interaction, using a pool of worker processes that share the loaded data
+    Parameters: 
+        hotel - A dataframe with information on hotel location 
+        hotelagg - dataframe with the per hotel review aggregates
+        selections - list of (state, list of cities) tuples, e.g. from allStateSelections()
+        outfolder - folder the image files are written to
+        formats - image file formats, e.g. png and svg. Default value is png only.
+        processes - number of worker processes. Default value is the number of CPUs.
+        topN - number of top rated hotels charted for each selection. Default value is 3.
+        locindex - optional dictionary returned from function buildLocationIndex(), built 
+                   from hotel when not given
+    Returns:
+           list of the written file paths
+    '''
+    
+    if locindex is None:
+        locindex = buildLocationIndex(hotel)
+    
+    os.makedirs(outfolder,exist_ok=True)
+    tasks = [(reportnum,userstate,list(cities),outfolder,list(formats),topN) 
+             for reportnum,(userstate,cities) in enumerate(selections,1)]
+    
+    filenames = []
+    with multiprocessing.Pool(processes,initializer=initReportWorker,initargs=(hotel,hotelagg,locindex)) as pool:
+        for reportfiles in pool.imap(renderHotelReport,tasks):
+            filenames += reportfiles
+    
+    return filenames
+
+
+def batchMain(args):
+    '''function used to render the charts of every state without user input.
+    Parameters: 
+        args - command line arguments: folder, hotel file, review file, output folder 
+               and optionally the number of worker processes
+    Returns: Nil
+    '''
+    folder,hotelfile,reviewfile,outfolder = args[:4]
+    processes = int(args[4]) if len(args) > 4 else None
+    
+    hotel = readCachedCsv((os.path.join(os.getcwd(),folder,hotelfile)))
+    review = readCachedCsv((os.path.join(os.getcwd(),folder,reviewfile)))
+    hotelagg = buildHotelAggregates(review)
+    
+    locindex = buildLocationIndex(hotel)
+    
+    filenames = renderHotelReports(hotel,hotelagg,allStateSelections(locindex),outfolder,('png','svg'),processes,locindex=locindex)
+    
+    print('Wrote',len(filenames),'files to',outfolder)
 
 def main():
-    folder,hotelfile,reviewfile = input('Please enter names of the subfolder and files:').split()
+    #optional settings after the file names: chunks=<reviews> streams the review file instead 
+    #of loading it, workers=<processes> aggregates the review file in parallel
+    userinput = input('Please enter names of the subfolder and files:').split()
+    folder,hotelfile,reviewfile = userinput[:3]
+    settings = dict(setting.partition('=')[::2] for setting in userinput[3:])
         
     pd.set_option('display.max_columns', 1000)
     pd.set_option('display.max_rows', 1000)
     pd.set_option('display.width', 1000) 
          
-    hotel = pd.read_csv((os.path.join(os.getcwd(),folder,hotelfile)))
+    hotel = readCachedCsv((os.path.join(os.getcwd(),folder,hotelfile)))
+    
+    if 'workers' in settings:
+        review = None
+        hotelagg = buildHotelAggregatesParallel(os.path.join(os.getcwd(),folder,reviewfile),int(settings['workers']))
+    elif 'chunks' in settings:
+        review = None
+        hotelagg = buildHotelAggregatesChunked(os.path.join(os.getcwd(),folder,reviewfile),int(settings['chunks']),progress=True)
+    else:
+        review = readCachedCsv((os.path.join(os.getcwd(),folder,reviewfile)))
+        hotelagg = buildHotelAggregates(review)
     
-    review = pd.read_csv((os.path.join(os.getcwd(),folder,reviewfile)))
+    locindex = buildLocationIndex(hotel)
     
-    userstate,usercity = pickStateAndCities(hotel)
+    userstate,usercity = pickStateAndCities(hotel,locindex)
      
-    userhotel, avgReview = selectHotelReviews(hotel,review,usercity,userstate)
+    userhotel, avgReview = selectHotelReviews(hotel,review,usercity,userstate,locindex=locindex,hotelagg=hotelagg)
     
     reviewsRatingsPlot(userhotel,avgReview)
     
-    ratingPercentageBarchart(avgReview,review,userstate)
+    ratingPercentageBarchart(avgReview,review,userstate,hotelagg)
     
     plt.show()
     
     print('Exiting...')
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        batchMain(sys.argv[2:])
+    else:
+        main()
@@ -13,67 +13,238 @@ import pandas as pd
 import numpy as np
 import os
 import os.path
+from collections import namedtuple
+from datacache import readCachedCsv
 
-def findClosestCritics(critic,personal):
+#set to True to keep the critic ratings in sparse storage instead of a dense DataFrame
+SPARSE_CRITICS = False
+
+#critic ratings stored row wise (CSR) by title, only the given ratings are kept
+SparseRatings = namedtuple('SparseRatings',['titles','critics','indptr','indices','data'])
+
+def buildSparseRatings(critic):
+    ''' function converts the dense critic DataFrame into sparse rating storage.
+    Parameters: 
+        critic -  DataFrame containing data about critics ratings, first column is the Title
+    Returns:
+           SparseRatings with title and critic id maps and the CSR arrays of the ratings
+    '''
+    
+    values = critic.iloc[:,1:].to_numpy(dtype=float)
+    rows,cols = np.nonzero(~np.isnan(values))
+    
+    indptr = np.zeros(len(critic.index)+1,dtype=np.int64)
+    np.cumsum(np.bincount(rows,minlength=len(critic.index)),out=indptr[1:])
+    
+    return SparseRatings(pd.Index(critic.index),pd.Index(critic.columns[1:]),indptr,
+                         cols.astype(np.int32),values[rows,cols])
+
+
+def readSparseCritics(filepath,chunksize=10000):
+    ''' function reads the critics file in chunks straight into sparse rating storage,
+        so the dense critic matrix is never held in memory.
+    Parameters: 
+        filepath - path to the critics ratings file
+        chunksize - number of titles parsed at a time. Default value is 10000.
+    Returns:
+           SparseRatings with title and critic id maps and the CSR arrays of the ratings
+    '''
+    
+    titles = []
+    rowcounts = []
+    indices = []
+    data = []
+    critics = None
+    
+    for chunk in pd.read_csv(filepath,chunksize=chunksize):
+        if critics is None:
+            critics = pd.Index(chunk.columns[1:])
+        values = chunk.iloc[:,1:].to_numpy(dtype=float)
+        rows,cols = np.nonzero(~np.isnan(values))
+        
+        titles.append(chunk.iloc[:,0].to_numpy())
+        rowcounts.append(np.bincount(rows,minlength=len(chunk)))
+        indices.append(cols.astype(np.int32))
+        data.append(values[rows,cols])
+    
+    indptr = np.zeros(sum(len(t) for t in titles)+1,dtype=np.int64)
+    np.cumsum(np.concatenate(rowcounts),out=indptr[1:])
+    
+    return SparseRatings(pd.Index(np.concatenate(titles),name='Title'),critics,indptr,
+                         np.concatenate(indices),np.concatenate(data))
+
+
+def sparseRows(ratings,rowpositions):
+    ''' function collects the stored ratings of the given title rows.
+    Parameters: 
+        ratings - SparseRatings with the critics ratings
+        rowpositions - array of title positions in ratings.titles
+    Returns:
+           tuple of arrays: position in rowpositions, critic id and rating of every stored rating
+    '''
+    
+    starts = ratings.indptr[rowpositions]
+    lengths = ratings.indptr[rowpositions+1]-starts
+    
+    owner = np.repeat(np.arange(len(rowpositions)),lengths)
+    offsets = np.arange(lengths.sum())-np.repeat(np.cumsum(lengths)-lengths,lengths)
+    entries = np.repeat(starts,lengths)+offsets
+    
+    return owner,ratings.indices[entries],ratings.data[entries]
+
+
+def sparseCriticDistances(ratings,personals):
+    ''' function computes the Euclidean distance between every person and every critic
+        using only the stored ratings of the titles the persons have rated.
+    Parameters: 
+        ratings - SparseRatings with the critics ratings
+        personals - DataFrame indexed by Title with one column of ratings per person
+    Returns:
+           DataFrame of distances with one row per person and one column per critic
+    '''
+    
+    #looking the titles up from the ratings side, so that repeated titles each count like in the dense path
+    personrows = personals.index.get_indexer(ratings.titles)
+    positions = np.flatnonzero(personrows >= 0)
+    
+    owner,criticids,values = sparseRows(ratings,positions)
+    personalvalues = personals.to_numpy(dtype=float)[personrows[positions][owner]]
+    
+    distances = np.zeros((len(personals.columns),len(ratings.critics)))
+    for person in range(len(personals.columns)):
+        diffsq = (personalvalues[:,person]-values)**2
+        common = ~np.isnan(diffsq)
+        distances[person] = np.bincount(criticids[common],weights=diffsq[common],minlength=len(ratings.critics))
+    
+    return pd.DataFrame(np.sqrt(distances),index=personals.columns,columns=ratings.critics)
+
+
+def sparseAverageRating(ratings,personal,CriticNames):
+    ''' function computes the average rating of the chosen critics for the titles
+        not yet seen by the person.
+    Parameters: 
+        ratings - SparseRatings with the critics ratings
+        personal - DataFrame containing data about personal ratings
+        CriticNames -  the list of critics to average
+    Returns:
+           Series named AvgRating indexed by Title, for titles rated by at least one chosen critic
+    '''
+    
+    rows = np.repeat(np.arange(len(ratings.titles)),np.diff(ratings.indptr))
+    chosen = np.isin(ratings.indices,ratings.critics.get_indexer(CriticNames))
+    chosen &= ~ratings.titles.isin(personal.index)[rows]
+    
+    ratingsum = np.bincount(rows[chosen],weights=ratings.data[chosen],minlength=len(ratings.titles))
+    ratingcount = np.bincount(rows[chosen],minlength=len(ratings.titles))
+    rated = ratingcount > 0
+    
+    return pd.Series(ratingsum[rated]/ratingcount[rated],index=ratings.titles[rated],name='AvgRating')
+
+
+def criticDistances(critic,personals):
+    ''' function computes the Euclidean distance between every person and every critic
+        in a single pass over the critic matrix. Titles rated by only one side are ignored.
+    Parameters: 
+        critic -  DataFrame or SparseRatings containing data about critics ratings
+        personals - DataFrame indexed by Title with one column of ratings per person
+    Returns:
+           DataFrame of distances with one row per person and one column per critic
+    '''
+    
+    if isinstance(critic,SparseRatings):
+        return sparseCriticDistances(critic,personals)
+    
+    #aligning the personal ratings with the critic titles once
+    personals = personals.reindex(critic.index)
+    personalvalues = personals.to_numpy(dtype=float)
+    
+    #only titles rated by at least one person can contribute to a distance
+    rated = ~np.isnan(personalvalues).all(axis=1)
+    personalvalues = personalvalues[rated]
+    criticvalues = critic.iloc[:,1:].to_numpy(dtype=float)[rated]
+    
+    #masking missing ratings so that only common titles are compared
+    personalmask = ~np.isnan(personalvalues)
+    criticmask = ~np.isnan(criticvalues)
+    personalvalues = np.where(personalmask,personalvalues,0.0)
+    criticvalues = np.where(criticmask,criticvalues,0.0)
+    
+    #sum of (p-c)^2 over common titles, expanded as p^2 + c^2 - 2pc
+    distsq = (personalvalues**2).T @ criticmask + personalmask.T @ (criticvalues**2) \
+             - 2*(personalvalues.T @ criticvalues)
+    
+    return pd.DataFrame(np.sqrt(np.clip(distsq,0,None)),index=personals.columns,columns=critic.columns[1:])
+
+
+def findClosestCriticsBatch(critic,personals,k=3):
+    ''' function identifies the k closest critics for many persons in one call. 
+    Parameters: 
+        critic -  DataFrame or SparseRatings containing data about critics ratings
+        personals - DataFrame indexed by Title with one column of ratings per person
+        k - number of critics to return for each person. Default value is 3.
+    Returns:
+           dictionary with the person name as key and the list of k closest critics as value
+    '''
+    
+    distances = criticDistances(critic,personals)
+    
+    #stable sort keeps the critic file order for equal distances
+    closest = np.argsort(distances.to_numpy(),axis=1,kind='stable')[:,:k]
+    
+    return {person:list(distances.columns[closest[row]]) for row,person in enumerate(distances.index)}
+
+
+def findClosestCritics(critic,personal,k=3):
     ''' function will be used to identify three critics, whose recommendations
         are closest to the persons recommendations. 
     Parameters: 
-        critic -  DataFrame containing data about critics ratings
+        critic -  DataFrame or SparseRatings containing data about critics ratings
         personal - DataFrame containing data about personal ratings
+        k - number of critics to return. Default value is 3.
     Returns:
            function returns a list of three critics, whose ratings of movies are most 
            similar to those provided in the personal ratings data, based on Euclidean distance
     '''
     
-    euclidean = pd.Series(0,index=critic.columns)
+    username = personal.columns[1]
     
-    for cri_num in range(1,len(critic.columns)):
-        temp = pd.merge(personal,critic.iloc[:,cri_num],how = 'inner',left_index=True,right_index=True)
-        
-        temp['DiffSq'] = (temp.iloc[:,1] - temp.iloc[:,2])**2
-    
-        euclidean.loc[critic.columns[cri_num]] = np.sqrt(temp['DiffSq'].sum())
-            
-    euclidean.sort_values(inplace=True)
-        
-    return list(euclidean.index[1:4])    
+    return findClosestCriticsBatch(critic,personal[[username]],k)[username]
         
 
-def recommendMovies(critic,personal,CriticNames,movies):
+def recommendMovies(critic,personal,CriticNames,movies,topN=1):
     ''' will be used to generate movie recommendations based on
         ratings by the chosen critics. 
     Parameters: 
-        critic -  DataFrame containing data about critics ratings
+        critic -  DataFrame or SparseRatings containing data about critics ratings
         personal - DataFrame containing data about personal ratings
         CriticNames -  the list of three critics most similar to the person returned from
                         function findClosestCritics()
         movies - DataFrame containing data about movies
+        topN - number of movies to recommend in each genre, movies tied with the last one
+               are also included. Default value is 1.
     Returns:
            function returns DataFrame with the top-rated unwatched movies in each genre category, 
            based on the average of the three critics ratings. 
     '''
     
-    NotSeen = critic[~critic.index.isin(personal.index)]
-    
-    moviesreco = pd.DataFrame(columns = movies.columns)
-    
-    NotSeen = NotSeen[CriticNames]
-    
-    NotSeen['AvgRating'] = NotSeen[CriticNames].mean(axis=1)
-    
-    MoviesWithRating = pd.merge(NotSeen['AvgRating'],movies,how='inner',left_index=True,right_index=True)
+    if isinstance(critic,SparseRatings):
+        AvgRating = sparseAverageRating(critic,personal,CriticNames)
+    else:
+        NotSeen = critic[~critic.index.isin(personal.index)]
+        
+        NotSeen = NotSeen[CriticNames]
+        
+        AvgRating = NotSeen[CriticNames].mean(axis=1).rename('AvgRating')
     
-    genregroup = MoviesWithRating.groupby(by='Genre1',axis=0)
-       
-    HighestRatingbyGenre = genregroup.max()['AvgRating']
+    MoviesWithRating = pd.merge(AvgRating,movies,how='inner',left_index=True,right_index=True)
     
-    for key,g in genregroup:
-        
-        testcase = MoviesWithRating[(MoviesWithRating['Genre1'] == key) & (MoviesWithRating['AvgRating'] >= HighestRatingbyGenre[key])]
+    #ranking the movies within each genre in one grouped pass, ties share the same rank
+    genrerank = MoviesWithRating.groupby(by='Genre1')['AvgRating'].rank(method='min',ascending=False)
     
-        moviesreco = pd.concat([moviesreco,testcase],axis=0,sort=True)
+    moviesreco = MoviesWithRating[genrerank <= topN]
+    moviesreco = moviesreco.sort_values(by=['Genre1','AvgRating'],ascending=[True,False],kind='stable')
         
-    return moviesreco
+    return moviesreco.sort_index(axis=1)
 
 def printRecommendations(moviesreco,username):
     ''' will be used to generate movie recommendations based on
@@ -113,13 +284,16 @@ the name of critics file, the name of personal ratings file, separated by spaces
     pd.set_option('display.max_rows', 1000)
     pd.set_option('display.width', 1000) 
          
-    movies = pd.read_csv((os.path.join(os.getcwd(),folder,moviesfile)),encoding = 'unicode_escape')
+    movies = readCachedCsv((os.path.join(os.getcwd(),folder,moviesfile)),encoding = 'unicode_escape')
     movies.set_index('Title',drop=False,inplace=True)
     
-    critic = pd.read_csv((os.path.join(os.getcwd(),folder,criticfile)))
-    critic.set_index('Title',drop=False,inplace=True)
+    if SPARSE_CRITICS:
+        critic = readSparseCritics(os.path.join(os.getcwd(),folder,criticfile))
+    else:
+        critic = readCachedCsv((os.path.join(os.getcwd(),folder,criticfile)))
+        critic.set_index('Title',drop=False,inplace=True)
     
-    personal = pd.read_csv((os.path.join(os.getcwd(),folder,personalfile)))
+    personal = readCachedCsv((os.path.join(os.getcwd(),folder,personalfile)))
     personal.set_index('Title',drop=False,inplace=True)
                 
     CriticNames = findClosestCritics(critic,personal)
@@ -133,4 +307,5 @@ the name of critics file, the name of personal ratings file, separated by spaces
     printRecommendations(moviesreco,personal.columns[1])
     
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
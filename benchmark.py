@@ -0,0 +1,337 @@
+'''
+This module measures how the main functions of the programs scale with the size of
+their input, running them on generated data of configurable size.
+Wall time, peak memory and throughput of every function are saved as JSON, so that
+the results of two runs can be compared to find regressions.
+
+Usage:
+    python benchmark.py [resultfile [scale ...]]
+    python benchmark.py --compare oldresultfile newresultfile
+'''
+
+import importlib.util
+import json
+import os
+import os.path
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+#charts are only drawn into memory while benchmarking
+os.environ.setdefault('MPLBACKEND','Agg')
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+#sizes of the generated data at scale 1
+BASE_SIZES = {'critics':200,'titles':2000,'hotels':500,'reviews':50000,
+              'orders':100000,'students':2000,'courses':100}
+
+GENRES = ['Action','Comedy','Drama','Horror','Romance','Sci-Fi','Thriller','Animation']
+STATES = ['CA','NY','TX','FL','WA','IL','MA','OR']
+
+def loadScript(filename,modulename):
+    '''Function imports one of the program scripts, whose file names are not module names.
+    Parameters:
+        filename - file name of the script in the script folder
+        modulename - name to register the module under
+    Returns:
+        the imported module
+    '''
+    spec = importlib.util.spec_from_file_location(modulename,os.path.join(SCRIPT_FOLDER,filename))
+    module = importlib.util.module_from_spec(spec)
+    #registering the module first so worker processes can find its functions
+    sys.modules[modulename] = module
+    spec.loader.exec_module(module)
+    return module
+
+def generateCritics(critics,titles,density=0.2,seed=0):
+    '''Function generates critic ratings, personal ratings and movie data in the layout
+        of the movie recommendation input files.
+    Parameters:
+        critics - number of critics
+        titles - number of movie titles
+        density - fraction of the titles rated by each critic
+        seed - seed of the random generator
+    Returns:
+        a tuple of the critic, personal and movies DataFrames, indexed by title
+    '''
+    rng = np.random.default_rng(seed)
+    titlenames = ['Movie '+str(num) for num in range(titles)]
+
+    ratings = rng.integers(1,6,(titles,critics)).astype(float)
+    ratings[rng.random((titles,critics)) >= density] = np.nan
+    critic = pd.DataFrame(ratings,columns=['Critic '+str(num) for num in range(critics)])
+    critic.insert(0,'Title',titlenames)
+    critic.set_index('Title',drop=False,inplace=True)
+
+    seen = rng.choice(titles,min(titles,20),replace=False)
+    personal = pd.DataFrame({'Title':[titlenames[num] for num in seen],
+                             'Person':rng.integers(1,6,len(seen)).astype(float)})
+    personal.set_index('Title',drop=False,inplace=True)
+
+    movies = pd.DataFrame({'Title':titlenames,'Year':rng.integers(1950,2020,titles),
+                           'Genre1':rng.choice(GENRES,titles)})
+    movies.set_index('Title',drop=False,inplace=True)
+
+    return critic,personal,movies
+
+def generateHotels(hotels,reviews,seed=0):
+    '''Function generates hotel locations and reviews in the layout of the hotel input files.
+    Parameters:
+        hotels - number of hotels
+        reviews - number of reviews
+        seed - seed of the random generator
+    Returns:
+        a tuple of the hotel and review DataFrames
+    '''
+    rng = np.random.default_rng(seed)
+    names = np.array(['Hotel '+str(num) for num in range(hotels)])
+
+    hotel = pd.DataFrame({'name':names,'city':['City '+str(num) for num in rng.integers(0,40,hotels)],
+                          'province':rng.choice(STATES,hotels)})
+    review = pd.DataFrame({'name':names[rng.integers(0,hotels,reviews)],
+                           'reviews_rating':rng.integers(2,11,reviews)/2})
+
+    return hotel,review
+
+def generateOrders(orders,days=31,seed=0):
+    '''Function generates order records in the layout of the order log, in time order.
+        After the order number and the customer each record holds whole item quantities,
+        like the order log, which composeOrderMatrix parses as int.
+    Parameters:
+        orders - number of orders
+        days - number of days in October 2019 the orders are spread over
+        seed - seed of the random generator
+    Returns:
+        a list of order records as lists of str
+    '''
+    rng = np.random.default_rng(seed)
+    opening = rng.integers(6*3600,24*3600,orders) + 86400*rng.integers(0,days,orders)
+    stamps = np.datetime64('2019-10-01T00:00:00') + np.sort(opening).astype('timedelta64[s]')
+    quantities = rng.integers(0,4,(orders,3)).astype(str).tolist()
+
+    return [[str(stamp).replace('T',' '),str(num),'Customer '+str(num%500)]+items
+            for num,(stamp,items) in enumerate(zip(stamps,quantities))]
+
+def generateEnrollment(folderpath,students,courses,seed=0):
+    '''Function writes program, prerequisite and class list files in the layout of
+        the enrollment input folder.
+    Parameters:
+        folderpath - path of the folder to write the files to
+        students - number of students
+        courses - number of courses
+        seed - seed of the random generator
+    Returns:
+        the list of course codes
+    '''
+    rng = np.random.default_rng(seed)
+    coursecodes = [str(1000+num) for num in range(courses)]
+    studentnums = [str(100000+num) for num in range(students)]
+    os.makedirs(folderpath,exist_ok=True)
+
+    #two overlapping programs
+    for programnum,programcourses in enumerate([coursecodes[:courses*2//3],coursecodes[courses//3:]],1):
+        with open(os.path.join(folderpath,'program'+str(programnum)+'.txt'),'w') as programfile:
+            programfile.write('Program '+str(programnum)+'\n')
+            for coursecode in programcourses:
+                programfile.write(coursecode+' Course '+coursecode+'\n')
+
+    #prerequisites always come from earlier courses, so they never form a cycle
+    with open(os.path.join(folderpath,'prereqs.txt'),'w') as prereqfile:
+        for num in range(5,courses):
+            if rng.random() < 0.5:
+                prereqs = rng.choice(num,rng.integers(1,4),replace=False)
+                prereqfile.write(coursecodes[num]+': '+' '.join(coursecodes[prereq] for prereq in prereqs)+'\n')
+
+    #one or two sections per course, each with its own class list file
+    for coursecode in coursecodes:
+        for section in range(rng.integers(1,3)):
+            roster = rng.choice(students,rng.integers(1,students//4+2),replace=False)
+            with open(os.path.join(folderpath,'c'+coursecode+'_'+str(section)+'.txt'),'w') as classfile:
+                classfile.write('c'+coursecode+' Section '+str(section)+'\n')
+                classfile.writelines(studentnums[num]+' Student '+str(num)+'\n' for num in roster)
+
+    return coursecodes
+
+def measure(function,items,repeat=3):
+    '''Function measures the best wall time of several calls and the peak memory of one call.
+    Parameters:
+        function - function without parameters to measure
+        items - number of input items processed by one call, used for the throughput
+        repeat - number of timed calls
+    Returns:
+        a dictionary with the wall time in seconds, the peak memory in bytes,
+        the items and the throughput in items per second
+    '''
+    seconds = float('inf')
+    for num in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds,time.perf_counter()-start)
+
+    #tracing slows the call down, so the memory is measured in a separate call
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds':seconds,'peak_bytes':peak,'items':items,
+            'throughput':items/seconds if seconds > 0 else None}
+
+def benchmarkMovies(scale,seed=0):
+    '''Function benchmarks findClosestCritics and recommendMovies.
+    Parameters:
+        scale - multiplier of the base data sizes
+        seed - seed of the data generators
+    Returns:
+        a dictionary of measurements by function name
+    '''
+    movie = loadScript('Movie Recommendation.py','movierecommendation')
+    critic,personal,movies = generateCritics(BASE_SIZES['critics']*scale,BASE_SIZES['titles']*scale,seed=seed)
+    criticnames = movie.findClosestCritics(critic,personal)
+
+    return {'findClosestCritics':measure(lambda: movie.findClosestCritics(critic,personal),critic.shape[1]-1),
+            'recommendMovies':measure(lambda: movie.recommendMovies(critic,personal,criticnames,movies),len(critic))}
+
+def benchmarkHotels(scale,seed=0):
+    '''Function benchmarks buildHotelAggregates, selectHotelReviews and ratingPercentageBarchart.
+    Parameters:
+        scale - multiplier of the base data sizes
+        seed - seed of the data generators
+    Returns:
+        a dictionary of measurements by function name
+    '''
+    hotels = loadScript('Hotel Rating & Recommendations.py','hotelrating')
+    hotel,review = generateHotels(BASE_SIZES['hotels']*scale,BASE_SIZES['reviews']*scale,seed)
+    hotelagg = hotels.buildHotelAggregates(review)
+    locindex = hotels.buildLocationIndex(hotel)
+
+    #the four first cities of the state with the most hotels
+    userstate = hotel['province'].value_counts().index[0]
+    userstate,usercity = hotels.selectStateAndCities(locindex,userstate,[1,2,3,4][:len(locindex[userstate][0])])
+    userhotel,avgReview = hotels.selectHotelReviews(hotel,None,usercity,userstate,False,locindex,hotelagg)
+
+    def drawBarcharts():
+        for figure in hotels.ratingPercentageBarchart(avgReview,None,userstate,hotelagg):
+            hotels.plt.close(figure)
+
+    return {'buildHotelAggregates':measure(lambda: hotels.buildHotelAggregates(review),len(review)),
+            'selectHotelReviews':measure(lambda: hotels.selectHotelReviews(hotel,None,usercity,userstate,False,locindex,hotelagg),len(userhotel)),
+            'ratingPercentageBarchart':measure(drawBarcharts,min(3,len(avgReview)))}
+
+def benchmarkOrders(scale,seed=0):
+    '''Function benchmarks composeOrderMatrix.
+    Parameters:
+        scale - multiplier of the base data sizes
+        seed - seed of the data generators
+    Returns:
+        a dictionary of measurements by function name
+    '''
+    ordersummary = loadScript('Generate Order Summary.py','ordersummary')
+    orders = generateOrders(BASE_SIZES['orders']*scale,seed=seed)
+
+    return {'composeOrderMatrix':measure(lambda: ordersummary.composeOrderMatrix(31,60,orders),len(orders))}
+
+def benchmarkEnrollment(scale,seed=0):
+    '''Function benchmarks initFromFiles and estimateClass over every course.
+    Parameters:
+        scale - multiplier of the base data sizes
+        seed - seed of the data generators
+    Returns:
+        a dictionary of measurements by function name
+    '''
+    enrollment = loadScript('Enrollement data in a college.py','enrollment')
+
+    with tempfile.TemporaryDirectory() as basepath:
+        coursecodes = generateEnrollment(os.path.join(basepath,'data'),BASE_SIZES['students']*scale,
+                                         BASE_SIZES['courses']*scale,seed)
+        filecount = len(os.listdir(os.path.join(basepath,'data')))
+        programdict,classdict,prereqdict = enrollment.initFromFiles('data',basepath)
+
+        def estimateAll():
+            for coursecode in coursecodes:
+                enrollment.estimateClass(coursecode,programdict,classdict,prereqdict)
+
+        return {'initFromFiles':measure(lambda: enrollment.initFromFiles('data',basepath),filecount),
+                'estimateClass':measure(estimateAll,len(coursecodes))}
+
+BENCHMARKS = [benchmarkMovies,benchmarkHotels,benchmarkOrders,benchmarkEnrollment]
+
+def runBenchmarks(scales,seed=0):
+    '''Function runs every benchmark at every scale.
+    Parameters:
+        scales - list of multipliers of the base data sizes
+        seed - seed of the data generators
+    Returns:
+        a dictionary describing the run, with the list of results
+    '''
+    results = []
+    for scale in scales:
+        for benchmark in BENCHMARKS:
+            for function,measurement in benchmark(scale,seed).items():
+                results.append(dict(function=function,scale=scale,**measurement))
+                print('%-26s scale %-4d %10.4f s %12d bytes' % (function,scale,measurement['seconds'],measurement['peak_bytes']))
+
+    return {'created':time.strftime('%Y-%m-%d %H:%M:%S'),'python':platform.python_version(),
+            'numpy':np.__version__,'pandas':pd.__version__,'seed':seed,'results':results}
+
+def compareResults(oldrun,newrun,tolerance=0.25):
+    '''Function prints the change in wall time and peak memory between two runs.
+    Parameters:
+        oldrun - dictionary returned from runBenchmarks() for the reference run
+        newrun - dictionary returned from runBenchmarks() for the new run
+        tolerance - relative slowdown above which a function is reported as a regression
+    Returns:
+        the list of (function, scale) pairs that got slower than the tolerance
+    '''
+    oldresults = {(result['function'],result['scale']):result for result in oldrun['results']}
+    regressions = []
+
+    print('%-26s %-5s %10s %10s %8s %8s' % ('function','scale','old s','new s','time','memory'))
+    for result in newrun['results']:
+        key = (result['function'],result['scale'])
+        if key not in oldresults:
+            continue
+        old = oldresults[key]
+        timeratio = result['seconds']/old['seconds'] if old['seconds'] > 0 else float('inf')
+        memoryratio = result['peak_bytes']/old['peak_bytes'] if old['peak_bytes'] > 0 else float('inf')
+
+        flag = ''
+        if timeratio > 1+tolerance:
+            regressions.append(key)
+            flag = '  slower'
+        print('%-26s %-5d %10.4f %10.4f %7.2fx %7.2fx%s' % (key[0],key[1],old['seconds'],result['seconds'],timeratio,memoryratio,flag))
+
+    return regressions
+
+def main(args):
+    '''function used to run the benchmarks or compare two result files
+    Parameters:
+        args - command line arguments: either the result file and the scales to run,
+               or --compare followed by the old and the new result file
+    Returns:
+        the exit status, 1 when a comparison finds regressions
+    '''
+    if len(args) > 2 and args[0] == '--compare':
+        with open(args[1]) as oldfile, open(args[2]) as newfile:
+            regressions = compareResults(json.load(oldfile),json.load(newfile))
+        return 1 if regressions else 0
+
+    resultfile = args[0] if args else 'benchmark.json'
+    scales = [int(scale) for scale in args[1:]] or [1]
+
+    run = runBenchmarks(scales)
+    with open(resultfile,'w') as outfile:
+        json.dump(run,outfile,indent=1)
+    print('Results saved to',resultfile)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,200 @@
+'''
+This module keeps a binary copy of the CSV input files, so that later runs
+of the programs can skip parsing the CSV text.
+The copy is rebuilt automatically when the CSV file changes.
+'''
+
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import numpy as np
+import pandas as pd
+
+CACHE_FOLDER = '.datacache'
+
+#without pyarrow every column is kept in its own .npy file, strings as codes into a text file of distinct values
+try:
+    import pyarrow
+    CACHE_FORMAT = 'feather'
+except ImportError:
+    CACHE_FORMAT = 'npy'
+
+#separates the distinct values of a string column in its text file
+STRING_SEPARATOR = '\x00'
+
+def fileDigest(filepath):
+    '''Function computes the SHA-1 digest of a file, reading it in blocks.
+    Parameters: 
+        filepath - path of the file
+    Returns:
+        the hexadecimal digest as a str
+    '''
+    digest = hashlib.sha1()
+    with open(filepath,'rb') as datafile:
+        for block in iter(lambda: datafile.read(1 << 20),b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cachePaths(filepath,options):
+    '''Function produces the paths of the cached data and its manifest for a CSV file.
+    Parameters: 
+        filepath - path of the CSV file
+        options - dictionary of the read_csv keyword arguments used to parse the file
+    Returns:
+        a tuple with the path of the cached data and the path of the manifest
+    '''
+    folder = os.path.join(os.path.dirname(os.path.abspath(filepath)),CACHE_FOLDER)
+    key = hashlib.sha1(repr(sorted(options.items())).encode()).hexdigest()[:12]
+    name = os.path.basename(filepath)+'.'+key
+    return os.path.join(folder,name+'.'+CACHE_FORMAT),os.path.join(folder,name+'.json')
+
+def writeColumns(data,folder):
+    '''Function stores every column of a DataFrame as a separate file in a folder, numeric 
+        and date columns as .npy arrays and string columns as .npy codes into the UTF-8 text 
+        of their distinct values, so repeated strings are decoded only once when read.
+    Parameters: 
+        data - DataFrame with a default index
+        folder - path of the folder to create
+    Returns:
+        The function does not return anything, raises ValueError or TypeError for data 
+        that cannot be stored this way
+    '''
+    if not isinstance(data.index,pd.RangeIndex) or data.index.start != 0 or data.index.step != 1:
+        raise ValueError('Only a DataFrame with a default index can be cached')
+    
+    os.makedirs(folder)
+    columns = []
+    for num,name in enumerate(data.columns):
+        column = data.iloc[:,num]
+        if isinstance(column.dtype,np.dtype) and column.dtype.kind in 'biufcmM':
+            np.save(os.path.join(folder,str(num)+'.npy'),column.to_numpy(),allow_pickle=False)
+            columns.append({'name':name,'dtype':str(column.dtype),'layout':'array'})
+            continue
+        
+        #missing values get the code -1
+        codes,uniques = pd.factorize(column.to_numpy(dtype=object))
+        if not all(isinstance(value,str) for value in uniques):
+            raise TypeError('Column '+str(name)+' holds values that are not strings')
+        
+        text = STRING_SEPARATOR.join(uniques.tolist())
+        if text.count(STRING_SEPARATOR) != max(len(uniques)-1,0):
+            raise ValueError('Column '+str(name)+' holds the string separator')
+        
+        with open(os.path.join(folder,str(num)+'.txt'),'wb') as textfile:
+            textfile.write(text.encode('utf-8'))
+        np.save(os.path.join(folder,str(num)+'.codes.npy'),codes,allow_pickle=False)
+        columns.append({'name':name,'dtype':str(column.dtype),'layout':'text','distinct':len(uniques)})
+    
+    with open(os.path.join(folder,'columns.json'),'w') as columnfile:
+        json.dump({'rows':len(data),'columns':columns},columnfile)
+
+def readColumns(folder):
+    '''Function loads a DataFrame stored by writeColumns(), memory-mapping the .npy arrays.
+    Parameters: 
+        folder - path of the folder written by writeColumns()
+    Returns:
+        the stored DataFrame
+    '''
+    with open(os.path.join(folder,'columns.json')) as columnfile:
+        layout = json.load(columnfile)
+    
+    data = {}
+    for num,column in enumerate(layout['columns']):
+        if column['layout'] == 'array':
+            data[num] = np.load(os.path.join(folder,str(num)+'.npy'),mmap_mode='r',allow_pickle=False)
+            continue
+        
+        with open(os.path.join(folder,str(num)+'.txt'),'rb') as textfile:
+            text = textfile.read().decode('utf-8')
+        #the missing value goes last, where the code -1 picks it
+        uniques = np.array((text.split(STRING_SEPARATOR) if column['distinct'] else [])+[np.nan],dtype=object)
+        codes = np.load(os.path.join(folder,str(num)+'.codes.npy'),mmap_mode='r',allow_pickle=False)
+        data[num] = pd.Series(uniques[codes],dtype=column['dtype'])
+    
+    data = pd.DataFrame(data,index=pd.RangeIndex(layout['rows']))
+    data.columns = [column['name'] for column in layout['columns']]
+    return data
+
+def writeCache(data,datapath,manifestpath,manifest):
+    '''Function stores the parsed data and its manifest, replacing any older copy.
+    Parameters: 
+        data - DataFrame parsed from the CSV file
+        datapath - path of the cached data
+        manifestpath - path of the manifest
+        manifest - dictionary describing the CSV file the data was parsed from
+    Returns:
+        The function does not return anything
+    '''
+    os.makedirs(os.path.dirname(datapath),exist_ok=True)
+    
+    #writing to temporary files first so an interrupted run never leaves a broken cache
+    if CACHE_FORMAT == 'feather':
+        data.to_feather(datapath+'.tmp')
+    else:
+        if os.path.exists(datapath+'.tmp'):
+            shutil.rmtree(datapath+'.tmp')
+        writeColumns(data,datapath+'.tmp')
+        if os.path.exists(datapath):
+            shutil.rmtree(datapath)
+    os.replace(datapath+'.tmp',datapath)
+    
+    with open(manifestpath+'.tmp','w') as manifestfile:
+        json.dump(manifest,manifestfile)
+    os.replace(manifestpath+'.tmp',manifestpath)
+
+def readCache(datapath):
+    '''Function loads cached data written by writeCache().
+    Parameters: 
+        datapath - path of the cached data
+    Returns:
+        the cached DataFrame
+    '''
+    if CACHE_FORMAT == 'feather':
+        return pd.read_feather(datapath,memory_map=True)
+    return readColumns(datapath)
+
+def readCachedCsv(filepath,**options):
+    '''Function returns the content of a CSV file, parsing it with pd.read_csv only when 
+        the cached copy is missing or the file has changed since the copy was made.
+        A changed modification time alone does not rebuild the cache if the file content is unchanged.
+    Parameters: 
+        filepath - path of the CSV file
+        options - keyword arguments passed on to pd.read_csv
+    Returns:
+        a DataFrame with the content of the CSV file
+    '''
+    datapath,manifestpath = cachePaths(filepath,options)
+    stat = os.stat(filepath)
+    
+    manifest = None
+    if os.path.exists(manifestpath) and os.path.exists(datapath):
+        with open(manifestpath) as manifestfile:
+            manifest = json.load(manifestfile)
+    
+    if manifest is not None:
+        if manifest['mtime'] == stat.st_mtime_ns and manifest['size'] == stat.st_size:
+            return readCache(datapath)
+        
+        #file touched but maybe not changed, comparing the content
+        digest = fileDigest(filepath)
+        if manifest['sha1'] == digest:
+            manifest.update(mtime=stat.st_mtime_ns,size=stat.st_size)
+            try:
+                with open(manifestpath,'w') as manifestfile:
+                    json.dump(manifest,manifestfile)
+            except OSError:
+                #a read-only folder keeps the old manifest, the content is compared again next time
+                pass
+            return readCache(datapath)
+    
+    data = pd.read_csv(filepath,**options)
+    try:
+        writeCache(data,datapath,manifestpath,{'mtime':stat.st_mtime_ns,'size':stat.st_size,'sha1':fileDigest(filepath)})
+    except (ValueError,TypeError,OSError):
+        #data the cache cannot hold, or a folder the cache cannot be written to, 
+        #is simply parsed again on the next run
+        pass
+    
+    return data